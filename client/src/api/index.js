@@ -2,6 +2,23 @@
 
 const BASE_URL = 'https://health-care-4-nmz5.onrender.com/';
 
+// List endpoints return one page at a time (50 rows unless `limit` is set);
+// follow the X-Next-Cursor header until the last page.
+export const fetchAllPages = async (url, options = {}) => {
+  const rows = [];
+  let after = null;
+  do {
+    const pageUrl = new URL(url);
+    pageUrl.searchParams.set('limit', '500');
+    if (after) pageUrl.searchParams.set('after', after);
+    const res = await fetch(pageUrl, options);
+    if (!res.ok) throw new Error(`Failed to fetch ${url}`);
+    rows.push(...(await res.json()));
+    after = res.headers.get('X-Next-Cursor');
+  } while (after);
+  return rows;
+};
+
 export const usersAPI = {
   getAll: async () => {
     const res = await fetch(`${BASE_URL}/users`);
@@ -11,11 +28,7 @@ export const usersAPI = {
 };
 
 export const appointmentsAPI = {
-  getAll: async () => {
-    const res = await fetch(`${BASE_URL}/appointments`);
-    if (!res.ok) throw new Error('Failed to fetch appointments');
-    return res.json();
-  },
+  getAll: () => fetchAllPages(`${BASE_URL}/appointments`),
   update: async (id, data) => {
     const res = await fetch(`${BASE_URL}/appointments/${id}`, {
       method: 'PATCH',
@@ -1,7 +1,15 @@
 import React, { useEffect, useState } from 'react';
 import { useAuth } from '../context/AuthContext';
+import { fetchAllPages } from '../api';
 import './Dashboard.css';
 
+// Status buttons per current status; mirrors scheduling.STATUS_TRANSITIONS on
+// the server (completed and cancelled are final)
+const STATUS_ACTIONS = {
+  pending: [['confirmed', 'Confirm'], ['cancelled', 'Cancel']],
+  confirmed: [['completed', 'Complete'], ['cancelled', 'Cancel']],
+};
+
 const Dashboard = () => {
   const { user, logout } = useAuth();
   const [appointments, setAppointments] = useState([]);
@@ -21,8 +29,7 @@ const Dashboard = () => {
 
   const fetchAppointments = async () => {
     try {
-      const response = await fetch('https://health-care-4-nmz5.onrender.com/api/appointments');
-      const data = await response.json();
+      const data = await fetchAllPages('https://health-care-4-nmz5.onrender.com/api/appointments');
       setAppointments(data);
     } catch (error) {
       console.error('Error fetching appointments:', error);
@@ -34,8 +41,7 @@ const Dashboard = () => {
 
   const fetchDoctors = async () => {
     try {
-      const response = await fetch('https://health-care-4-nmz5.onrender.com/api/doctors');
-      const data = await response.json();
+      const data = await fetchAllPages('https://health-care-4-nmz5.onrender.com/api/doctors');
       setDoctors(data);
     } catch (error) {
       console.error('Error fetching doctors:', error);
@@ -80,7 +86,8 @@ const Dashboard = () => {
         showMessage(`Appointment ${status} successfully!`);
         await fetchAppointments();
       } else {
-        showMessage('Error updating status');
+        const data = await response.json().catch(() => ({}));
+        showMessage(data.message || 'Error updating status');
       }
     } catch (error) {
       console.error('Error updating status:', error);
@@ -173,15 +180,11 @@ const Dashboard = () => {
               <p>Appointment ID: {appt.id} | Date: {appt.date} {appt.time}</p>
               <p>Status: {appt.status} | Reason: {appt.reason}</p>
               <div className="status-buttons">
-                <button onClick={() => handleUpdateStatus(appt.id, 'confirmed')}>
-                  Confirm
-                </button>
-                <button onClick={() => handleUpdateStatus(appt.id, 'completed')}>
-                  Complete
-                </button>
-                <button onClick={() => handleUpdateStatus(appt.id, 'cancelled')}>
-                  Cancel
-                </button>
+                {(STATUS_ACTIONS[appt.status || 'pending'] || []).map(([status, label]) => (
+                  <button key={status} onClick={() => handleUpdateStatus(appt.id, status)}>
+                    {label}
+                  </button>
+                ))}
               </div>
             </div>
           ))}
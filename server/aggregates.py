@@ -0,0 +1,209 @@
+"""Appointment counts per doctor, day and status for the dashboard.
+
+``appointment_daily_counts`` is kept in step with ``appointments`` as part of
+the writing transaction. ORM flushes (create, update, delete, cascades) are
+tracked automatically by the ``after_flush`` hook below. Statements that
+bypass the unit of work (bulk import, bulk status updates) call ``apply()``
+with their own deltas; rows about to be removed by a database cascade or a
+bulk delete are taken out with ``subtract()``. Archiving (archive.py) moves
+appointments without changing the counts: they cover ``appointments_archive``
+too. ``flask aggregates check`` compares the table with a full recount and
+``flask aggregates rebuild`` recomputes it.
+"""
+from collections import Counter
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import Date, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+from extensions import db
+from models import Appointment, AppointmentDailyCount, ArchivedAppointment
+
+DEFAULT_STATUS = "pending"
+
+
+class day_of(FunctionElement):
+    """Calendar day of a DateTime column."""
+    type = Date()
+    inherit_cache = True
+
+
+@compiles(day_of)
+def _day_of(element, compiler, **kw):
+    return f"CAST({compiler.process(element.clauses, **kw)} AS DATE)"
+
+
+@compiles(day_of, "sqlite")
+def _day_of_sqlite(element, compiler, **kw):
+    # SQLite has no DATE type; date() yields the YYYY-MM-DD text SQLAlchemy's Date reads
+    return f"date({compiler.process(element.clauses, **kw)})"
+
+
+def key(doctor_id, start_at, status):
+    return doctor_id, start_at.date(), status or DEFAULT_STATUS
+
+
+# -----------------------------
+# Applying deltas
+# -----------------------------
+
+def _upsert(connection, table, rows):
+    dialects = {"sqlite": sqlite, "postgresql": postgresql}
+    dialect = dialects.get(connection.dialect.name)
+    if dialect is not None:
+        statement = dialect.insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.doctor_id, table.c.day, table.c.status],
+            set_={"count": table.c.count + statement.excluded["count"]},
+        )
+        connection.execute(statement, rows)
+        return
+    for row in rows:
+        matched = connection.execute(
+            table.update()
+            .where(table.c.doctor_id == row["doctor_id"], table.c.day == row["day"], table.c.status == row["status"])
+            .values(count=table.c.count + row["count"])
+        ).rowcount
+        if not matched:
+            connection.execute(table.insert(), row)
+
+
+def apply(deltas, connection=None):
+    """Add ``{(doctor_id, day, status): change}`` to the counts.
+
+    Runs on the session's connection, so the change commits or rolls back
+    with the write that caused it.
+    """
+    rows = [{"doctor_id": doctor_id, "day": day, "status": status, "count": change}
+            for (doctor_id, day, status), change in deltas.items() if change]
+    if not rows:
+        return
+    connection = connection if connection is not None else db.session.connection()
+    table = AppointmentDailyCount.__table__
+    _upsert(connection, table, rows)
+    emptied = {row["doctor_id"] for row in rows if row["count"] < 0}
+    if emptied:
+        connection.execute(table.delete().where(table.c.doctor_id.in_(emptied), table.c.count == 0))
+
+
+def subtract(criteria, connection=None, model=Appointment):
+    """Remove the appointments matching ``criteria`` from the counts.
+
+    Call before a statement deletes them; the counts are grouped in SQL, so
+    the appointments themselves are never loaded. ``model`` may be
+    ``ArchivedAppointment`` for archived rows.
+    """
+    connection = connection if connection is not None else db.session.connection()
+    deltas = Counter({(doctor_id, day, status): -count
+                      for doctor_id, day, status, count in connection.execute(_recount(model).where(criteria))})
+    apply(deltas, connection)
+
+
+def _old_key(appointment):
+    state = inspect(appointment)
+
+    def old(name):
+        history = state.attrs[name].history
+        return (history.deleted or history.unchanged or history.added)[0]
+
+    return key(old("doctor_id"), old("start_at"), old("status"))
+
+
+def _new_key(appointment):
+    return key(appointment.doctor_id, appointment.start_at, appointment.status)
+
+
+@db.event.listens_for(db.session, "before_flush")
+def _load_deleted(session, flush_context, instances):
+    # Deleted rows can't be refreshed after the flush, so load what we need now
+    for obj in session.deleted:
+        if isinstance(obj, Appointment):
+            obj.doctor_id, obj.start_at, obj.status  # noqa: B018
+
+
+@db.event.listens_for(db.session, "after_flush")
+def _track_flush(session, flush_context):
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, Appointment):
+            deltas[_new_key(obj)] += 1
+    for obj in session.deleted:
+        if isinstance(obj, Appointment):
+            deltas[_old_key(obj)] -= 1
+    for obj in session.dirty:
+        if isinstance(obj, Appointment) and session.is_modified(obj):
+            before, after = _old_key(obj), _new_key(obj)
+            if before != after:
+                deltas[before] -= 1
+                deltas[after] += 1
+    apply(deltas, session.connection())
+
+
+# -----------------------------
+# Full recount
+# -----------------------------
+
+def _recount(model=Appointment):
+    day = day_of(model.start_at)
+    status = db.func.coalesce(model.status, DEFAULT_STATUS)
+    return db.select(model.doctor_id, day, status, db.func.count()).group_by(model.doctor_id, day, status)
+
+
+def _recount_all():
+    # Live and archived appointments, summed per group
+    both = db.union_all(_recount(Appointment), _recount(ArchivedAppointment)).subquery()
+    doctor_id, day, status, count = both.c
+    return db.select(doctor_id, day, status, db.func.sum(count)).group_by(doctor_id, day, status)
+
+
+def rebuild():
+    """Recompute every count from ``appointments`` and the archive in one transaction."""
+    table = AppointmentDailyCount.__table__
+    db.session.execute(table.delete())
+    db.session.execute(table.insert().from_select(["doctor_id", "day", "status", "count"], _recount_all()))
+    db.session.commit()
+    return db.session.scalar(db.select(db.func.count()).select_from(table))
+
+
+def check():
+    """Return ``[(doctor_id, day, status, stored, actual), ...]`` for every mismatch."""
+    stored = {(row.doctor_id, row.day, row.status): row.count
+              for row in db.session.execute(db.select(AppointmentDailyCount))
+              .scalars() if row.count}
+    actual = {(doctor_id, day, status): count for doctor_id, day, status, count in db.session.execute(_recount_all())}
+    return sorted(
+        (*group, stored.get(group, 0), actual.get(group, 0))
+        for group in stored.keys() | actual.keys()
+        if stored.get(group, 0) != actual.get(group, 0)
+    )
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+
+@click.group("aggregates")
+def cli():
+    """Dashboard aggregate maintenance."""
+
+
+@cli.command("check")
+@with_appcontext
+def check_command():
+    """Compare the stored counts with a full recount (exit 1 on drift)."""
+    mismatches = check()
+    for doctor_id, day, status, stored, actual in mismatches:
+        click.echo(f"doctor {doctor_id} {day} {status}: stored {stored}, actual {actual}")
+    if mismatches:
+        raise click.ClickException(f"{len(mismatches)} counts out of date; run `flask aggregates rebuild`")
+    click.echo("Aggregates are consistent ✅")
+
+
+@cli.command("rebuild")
+@with_appcontext
+def rebuild_command():
+    """Recompute the counts from the appointments table."""
+    click.echo(f"Rebuilt {rebuild()} daily counts ✅")
@@ -0,0 +1,116 @@
+"""Hot/cold split of appointments.
+
+Completed and cancelled appointments that started more than
+``ARCHIVE_HORIZON_DAYS`` ago (default 90) are moved from ``appointments`` to
+``appointments_archive`` by ``flask archive run``, so the live table and its
+indexes only hold the part clinics work with. Rows keep their ids and
+columns; the daily counts cover both tables and are left alone.
+
+The job moves ``--batch-size`` rows per transaction. Every batch is
+complete on its own, so the job can be stopped at any point (or limited
+with ``--max-batches``) and the next run simply carries on.
+
+List and export reads call ``reaches()`` and only query the archive when
+their date range and status filter can include archived rows.
+"""
+from datetime import datetime, time, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from extensions import db
+from models import Appointment, ArchivedAppointment
+
+# Final statuses; nothing moves an appointment out of them
+ARCHIVED_STATUSES = ("completed", "cancelled")
+DEFAULT_HORIZON_DAYS = 90
+DEFAULT_BATCH_SIZE = 1000
+COLUMNS = ("id", "date", "time", "start_at", "status", "reason", "version", "patient_id", "doctor_id")
+
+
+def cutoff(horizon_days=None):
+    """Appointments starting before this are old enough to archive."""
+    if horizon_days is None:
+        horizon_days = current_app.config.get("ARCHIVE_HORIZON_DAYS", DEFAULT_HORIZON_DAYS)
+    return datetime.combine(datetime.now().date() - timedelta(days=horizon_days), time.min)
+
+
+def _eligible(before):
+    return db.and_(Appointment.status.in_(ARCHIVED_STATUSES), Appointment.start_at < before)
+
+
+def archive_batch(before, batch_size=DEFAULT_BATCH_SIZE):
+    """Move up to ``batch_size`` appointments in one transaction; returns how many moved."""
+    ids = db.session.scalars(db.select(Appointment.id).where(_eligible(before)).limit(batch_size)).all()
+    if not ids:
+        return 0
+    live, archived = Appointment.__table__, ArchivedAppointment.__table__
+    selected = live.c.id.in_(ids)
+    # Core statements: the ORM hooks would log the move as a delete
+    db.session.execute(archived.insert().from_select(
+        COLUMNS, db.select(*(live.c[column] for column in COLUMNS)).where(selected)))
+    db.session.execute(live.delete().where(selected))
+    db.session.commit()
+    return len(ids)
+
+
+def pending(before):
+    return db.session.scalar(db.select(db.func.count()).select_from(Appointment).where(_eligible(before)))
+
+
+def newest():
+    """Start of the latest archived appointment, or ``None`` while the archive is empty."""
+    return db.session.scalar(db.select(db.func.max(ArchivedAppointment.start_at)))
+
+
+def reaches(date_from=None, status=None):
+    """Whether appointments starting on or after ``date_from`` with ``status`` may be archived."""
+    if status and status not in ARCHIVED_STATUSES:
+        return False
+    latest = newest()
+    if latest is None:
+        return False
+    return date_from is None or latest >= datetime.combine(date_from, time.min)
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+
+@click.group("archive")
+def cli():
+    """Move past appointments to the archive table."""
+
+
+@cli.command("run")
+@click.option("--days", type=int, default=None, help="Archive appointments older than this many days.")
+@click.option("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, show_default=True)
+@click.option("--max-batches", type=int, default=None, help="Stop after this many batches; rerun to continue.")
+@with_appcontext
+def run_command(days, batch_size, max_batches):
+    """Archive completed and cancelled appointments past the horizon."""
+    before = cutoff(days)
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        count = archive_batch(before, batch_size)
+        if not count:
+            break
+        moved += count
+        batches += 1
+        click.echo(f"Batch {batches}: archived {count} appointments")
+    left = pending(before)
+    click.echo(f"Archived {moved} appointments starting before {before:%Y-%m-%d} ✅"
+               + (f" ({left} left; run again to continue)" if left else ""))
+
+
+@cli.command("status")
+@with_appcontext
+def status_command():
+    """Show live and archived appointment counts."""
+    live = db.session.scalar(db.select(db.func.count()).select_from(Appointment))
+    archived = db.session.scalar(db.select(db.func.count()).select_from(ArchivedAppointment))
+    click.echo(f"Live: {live}, archived: {archived}, pending: {pending(cutoff())}")
+    latest = newest()
+    if latest is not None:
+        click.echo(f"Latest archived appointment starts {latest:%Y-%m-%d %H:%M}")
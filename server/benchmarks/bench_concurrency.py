@@ -0,0 +1,143 @@
+"""Measure list-read latency while doctors hammer status updates.
+
+Run from the ``server`` directory::
+
+    python -m benchmarks.bench_concurrency --readers 8 --writers 4 --seconds 10
+
+For each engine profile a throwaway SQLite file is filled by
+``benchmarks.synthetic`` and served by a threaded WSGI server. Writer threads
+PATCH appointment statuses while reader threads page through
+``/api/appointments``; the report compares read latency percentiles between
+the old rollback-journal setup and the WAL profile from ``database.py``.
+"""
+import argparse
+import http.client
+import json
+import logging
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import deque
+
+PROFILES = {
+    # What server.py did before database.py: rollback journal, stock pool
+    "rollback journal": {
+        "SQLITE_JOURNAL_MODE": "DELETE", "SQLITE_SYNCHRONOUS": "FULL", "SQLITE_CACHE_SIZE_KB": 0,
+        "SQLITE_MMAP_SIZE": 0, "DB_POOL_SIZE": 5, "DB_MAX_OVERFLOW": 10,
+    },
+    "WAL profile": {},
+    "WAL profile + read pool": {"DB_READ_POOL": True},
+}
+
+
+def _percentile(samples, fraction):
+    return samples[max(0, math.ceil(len(samples) * fraction) - 1)] if samples else 0.0
+
+
+def _worker(port, stop, build, samples, errors):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    while not stop.is_set():
+        request = build()
+        if request is None:
+            break
+        method, path, body, headers = request
+        started = time.perf_counter()
+        try:
+            conn.request(method, path, body=json.dumps(body) if body is not None else None,
+                         headers={"Content-Type": "application/json", **headers})
+            response = conn.getresponse()
+            response.read()
+            ok = response.status < 400
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            ok = False
+        samples.append((time.perf_counter() - started) * 1000)
+        if not ok:
+            errors.append(path)
+    conn.close()
+
+
+def run_profile(name, overrides, args):
+    from werkzeug.serving import make_server
+    from server import create_app
+    from extensions import db
+    from models import Appointment
+    from benchmarks.synthetic import generate
+    import scheduling
+
+    workdir = tempfile.mkdtemp(prefix="bench-concurrency-")
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(workdir, 'bench.db')}", **overrides})
+    with app.app_context():
+        ids = generate(db, args.doctors, args.patients, args.appointments, args.seed)
+        open_appointments = db.session.execute(
+            db.select(Appointment.id, Appointment.status).where(Appointment.status.in_(("pending", "confirmed")))
+        ).all()
+    doctor_ids = ids["doctor_ids"]
+
+    rng = random.Random(args.seed)
+    # Every PATCH moves an appointment one allowed step on (pending -> confirmed
+    # -> completed), so each write really changes a row instead of getting 409
+    moves = [(appointment_id, scheduling.STATUS_TRANSITIONS[status][0]) for appointment_id, status in open_appointments]
+    rng.shuffle(moves)
+    moves = deque(moves)
+    moves_lock = threading.Lock()
+
+    def read():
+        return "GET", f"/api/appointments?doctor_id={rng.choice(doctor_ids)}&limit=50", None, {}
+
+    def write():
+        with moves_lock:
+            if not moves:
+                return None  # every appointment is final; the writer stops
+            appointment_id, status = moves.pop()
+            following = scheduling.STATUS_TRANSITIONS[status]
+            if following:
+                moves.appendleft((appointment_id, following[0]))
+        return "PATCH", f"/api/appointments/{appointment_id}/status", {"status": status}, {"Role": "doctor"}
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    stop = threading.Event()
+    reads, writes, errors = [], [], []
+    threads = [threading.Thread(target=_worker, args=(server.port, stop, read, reads, errors)) for _ in range(args.readers)]
+    threads += [threading.Thread(target=_worker, args=(server.port, stop, write, writes, errors)) for _ in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    server.shutdown()
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+    reads.sort()
+    print(f"{name:<26} reads/s {len(reads) / args.seconds:8.1f}  p50 {_percentile(reads, 0.5):7.1f}  "
+          f"p95 {_percentile(reads, 0.95):7.1f}  p99 {_percentile(reads, 0.99):7.1f}  "
+          f"max {reads[-1] if reads else 0:7.1f} ms   writes/s {len(writes) / args.seconds:7.1f}   errors {len(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--doctors", type=int, default=1000)
+    parser.add_argument("--patients", type=int, default=10_000)
+    parser.add_argument("--appointments", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--profile", choices=PROFILES, action="append", help="run only these profiles")
+    args = parser.parse_args()
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    for name in args.profile or PROFILES:
+        run_profile(name, PROFILES[name], args)
+
+
+if __name__ == "__main__":
+    main()
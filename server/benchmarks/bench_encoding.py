@@ -0,0 +1,81 @@
+"""Compare bytes on the wire and CPU cost of each response encoding.
+
+Run from the ``server`` directory::
+
+    python -m benchmarks.bench_encoding --appointments 100000 --limit 500
+
+Fetches full list pages through the Flask test client with every
+combination of body format (JSON, MessagePack) and Content-Encoding
+(identity, gzip, deflate), then times the encoding steps alone on the same
+page: body serialization and compression at each ``COMPRESS_LEVEL``.
+"""
+import argparse
+import os
+import tempfile
+import time
+import zlib
+
+ENDPOINTS = ("/api/appointments", "/api/patients")
+FORMATS = ("application/json", "application/msgpack")
+ENCODINGS = ("identity", "gzip", "deflate")
+
+
+def _best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--appointments", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-encoding-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from server import app
+    from extensions import db
+    from benchmarks.synthetic import generate
+    import negotiation
+
+    formats = FORMATS if negotiation.msgpack is not None else FORMATS[:1]
+    if negotiation.msgpack is None:
+        print("msgpack is not installed: JSON only")
+    with app.app_context():
+        generate(db, doctors=100, patients=max(1, args.appointments // 10), appointments=args.appointments)
+
+    client = app.test_client()
+    for endpoint in ENDPOINTS:
+        url = f"{endpoint}?limit={args.limit}"
+        print(f"\n{url}")
+        print(f"{'format':<22}{'encoding':<10}{'bytes':>10}{'ratio':>8}{'request ms':>12}")
+        for mimetype in formats:
+            identity = None
+            for encoding in ENCODINGS:
+                headers = {"Accept": mimetype, "Accept-Encoding": encoding}
+                elapsed, response = _best(lambda: client.get(url, headers=headers), args.repeat)
+                size = len(response.data)
+                identity = identity or size
+                print(f"{mimetype:<22}{encoding:<10}{size:>10}{identity / size:>8.1f}{elapsed:>12.2f}")
+
+        # The encoding steps alone, on the same page
+        with app.test_request_context(url):
+            page = client.get(url).get_json()
+            json_ms, body = _best(lambda: app.json.response(page).get_data(), args.repeat)
+            print(f"serialize JSON                {json_ms:8.2f} ms  {len(body)} bytes")
+            if negotiation.msgpack is not None:
+                packed_ms, packed = _best(lambda: negotiation.msgpack.packb(page), args.repeat)
+                print(f"serialize MessagePack         {packed_ms:8.2f} ms  {len(packed)} bytes")
+        for level in (1, 6, 9):
+            gzip_ms, compressed = _best(lambda: zlib.compress(body, level), args.repeat)
+            print(f"compress JSON, level {level}         {gzip_ms:8.2f} ms  {len(compressed)} bytes")
+
+
+if __name__ == "__main__":
+    main()
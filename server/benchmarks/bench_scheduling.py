@@ -0,0 +1,82 @@
+"""Benchmark the scheduling engine on a large synthetic clinic.
+
+Run from the ``server`` directory::
+
+    python -m benchmarks.bench_scheduling --doctors 10000 --appointments 1000000
+
+A throwaway SQLite file is created in a temporary directory. Reported numbers
+are per-call latencies of the conflict check and availability lookups,
+next to a naive baseline that loads a doctor's whole schedule and scans it.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def _measure(label, fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    p95 = samples[int(len(samples) * 0.95) - 1] if len(samples) >= 20 else samples[-1]
+    print(f"{label:<42} mean {statistics.fmean(samples):8.3f} ms   p95 {p95:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--doctors", type=int, default=10_000)
+    parser.add_argument("--appointments", type=int, default=1_000_000)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-scheduling-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from server import app
+    from extensions import db
+    from models import Appointment
+    from benchmarks.synthetic import SPECIALIZATIONS, generate
+    import scheduling
+
+    rng = random.Random(args.seed)
+    with app.app_context():
+        started = time.perf_counter()
+        doctor_ids = generate(db, args.doctors, max(1, args.appointments // 10), args.appointments, args.seed)["doctor_ids"]
+        print(f"Loaded {args.doctors} doctors / {args.appointments} appointments "
+              f"in {time.perf_counter() - started:.1f}s ({workdir})")
+
+        def random_start():
+            return datetime(2025, 1, 1, 9, 0) + timedelta(days=rng.randrange(365), minutes=30 * rng.randrange(16))
+
+        def conflict_check():
+            scheduling.find_conflict(rng.choice(doctor_ids), random_start())
+
+        def naive_conflict_check():
+            start_at, length = random_start(), scheduling.slot_length()
+            schedule = Appointment.query.filter_by(doctor_id=rng.choice(doctor_ids)).all()
+            any(a.start_at < start_at + length and a.start_at + length > start_at for a in schedule)
+
+        def doctor_week():
+            day = random_start().date()
+            scheduling.availability([rng.choice(doctor_ids)], day, day + timedelta(days=6))
+
+        def specialization_day():
+            day = random_start().date()
+            doctors = scheduling.doctor_ids_for_specialization(rng.choice(SPECIALIZATIONS))
+            scheduling.availability(doctors, day, day)
+
+        _measure("find_conflict (indexed)", conflict_check, args.iterations)
+        _measure("conflict via full doctor schedule", naive_conflict_check, args.iterations)
+        _measure("availability: 1 doctor x 7 days", doctor_week, args.iterations)
+        _measure("availability: specialization x 1 day", specialization_day, max(1, args.iterations // 50))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark typeahead search on a large synthetic patient table.
+
+Run from the ``server`` directory::
+
+    python -m benchmarks.bench_search --patients 1000000
+
+A throwaway SQLite file is created in a temporary directory. Each query is
+typed one character at a time, as a typeahead would send it, and the FTS5
+path is compared with the LIKE fallback used on other databases.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+QUERIES = ["alice smith", "njeri otieno", "patient12345", "dr priya", "cardio"]
+
+
+def _run(label, fn, queries, repeat):
+    samples = []
+    for _ in range(repeat):
+        for query in queries:
+            for end in range(1, len(query) + 1):
+                started = time.perf_counter()
+                fn(query[:end])
+                samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    p50, p95 = samples[len(samples) // 2], samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<28} p50 {p50:8.2f} ms   p95 {p95:8.2f} ms   max {samples[-1]:8.2f} ms   ({len(samples)} queries)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--patients", type=int, default=1_000_000)
+    parser.add_argument("--doctors", type=int, default=10_000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-search-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from server import app
+    from extensions import db
+    from benchmarks.synthetic import generate
+    import search
+
+    with app.app_context():
+        started = time.perf_counter()
+        generate(db, args.doctors, args.patients, 0, args.seed)
+        print(f"Loaded {args.doctors} doctors / {args.patients} patients "
+              f"in {time.perf_counter() - started:.1f}s ({workdir})")
+
+        for resource in search.TARGETS:
+            _run(f"{resource}: FTS5", lambda q: search.search(resource, q, args.limit), QUERIES, args.repeat)
+        like = {resource: lambda q, r=resource: db.session.execute(
+            search._like_query(r, search.terms(q))).all() for resource in search.TARGETS}
+        for resource in search.TARGETS:
+            _run(f"{resource}: LIKE fallback", like[resource], QUERIES, 1)
+
+
+if __name__ == "__main__":
+    main()
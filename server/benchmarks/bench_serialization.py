@@ -0,0 +1,58 @@
+"""Compare marshmallow schema dumps with the column-projection serializers.
+
+Run from the ``server`` directory::
+
+    python -m benchmarks.bench_serialization --rows 100000
+
+Each variant turns the same rows into a list of dicts (query time included),
+which is the work a list endpoint does before JSON encoding.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+
+def _time(label, fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<44} {best * 1000:9.1f} ms  ({len(result)} rows)")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-serialization-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from server import app
+    from extensions import db
+    from models import Appointment, AppointmentSchema
+    from serializers import appointment_serializer
+    from benchmarks.synthetic import generate
+
+    schema = AppointmentSchema(many=True)
+    all_fields = appointment_serializer.parse_fields(None)
+    sparse = appointment_serializer.parse_fields("id,status,start_at")
+
+    def projected(fields):
+        rows = Appointment.query.with_entities(*appointment_serializer.entities(fields)).order_by(Appointment.id)
+        return appointment_serializer.dump(rows.all(), fields)
+
+    with app.app_context():
+        generate(db, doctors=100, patients=1000, appointments=args.rows)
+        baseline = _time("marshmallow AppointmentSchema.dump", lambda: schema.dump(Appointment.query.order_by(Appointment.id).all()), args.repeat)
+        full = _time("RowSerializer, all columns", lambda: projected(all_fields), args.repeat)
+        partial = _time("RowSerializer, ?fields=id,status,start_at", lambda: projected(sparse), args.repeat)
+        print(f"speedup: {baseline / full:.1f}x (all columns), {baseline / partial:.1f}x (sparse)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""Drive every API route and report throughput and latency percentiles.
+
+Run from the ``server`` directory::
+
+    python -m benchmarks.load_test --appointments 100000 --requests 200
+    python -m benchmarks.load_test --mode wsgi --concurrency 8 --save baseline.json
+    python -m benchmarks.load_test --compare baseline.json --max-regression 0.25
+
+Each run builds a throwaway SQLite database filled by ``benchmarks.synthetic``.
+It then exercises the routes through the Flask test client (``client``), a real
+threaded WSGI server over HTTP (``wsgi``), or both. The exit status is 1 when
+a request fails, an endpoint's p95 exceeds its budget in ``thresholds.json``,
+or p95 regresses past ``--max-regression`` against a saved run.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+THRESHOLDS_FILE = os.path.join(os.path.dirname(__file__), "thresholds.json")
+ADMIN = {"Role": "admin"}
+DOCTOR = {"Role": "doctor"}
+
+
+# -----------------------------
+# Scenarios
+# -----------------------------
+
+class Context:
+    """Ids and pools shared by the scenarios of one run (thread-safe)."""
+
+    def __init__(self, doctor_ids, patient_ids, doctor_names, seed):
+        self.rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.doctor_ids = doctor_ids
+        self.patient_ids = patient_ids
+        self.doctor_names = doctor_names
+        self._slots = itertools.count()
+        self.created = {"patients": deque(), "doctors": deque(), "appointments": deque()}
+
+    def choice(self, values):
+        with self._rng_lock:
+            return self.rng.choice(values)
+
+    def booking(self):
+        # Walk doctors round-robin through free slots from 2030 on, so bookings never conflict
+        slot = next(self._slots)
+        doctor_id = self.doctor_ids[slot % len(self.doctor_ids)]
+        day, index = divmod(slot // len(self.doctor_ids), 16)
+        start_at = datetime(2030, 1, 1, 9, 0) + timedelta(days=day, minutes=30 * index)
+        return {"date": start_at.date().isoformat(), "time": start_at.strftime("%H:%M"),
+                "doctor_id": doctor_id, "patient_id": self.choice(self.patient_ids)}
+
+
+class Scenario:
+    def __init__(self, endpoint, method, build, expect=(200,), keep=None):
+        self.endpoint = endpoint
+        self.method = method
+        self.build = build    # ctx -> (path, json_body, headers)
+        self.expect = expect
+        self.keep = keep      # pool name for ids of created resources
+
+
+def _existing(pool):
+    return lambda ctx: ctx.created[pool].popleft()
+
+
+def build_scenarios():
+    week = date(2025, 3, 3)
+    return [
+        Scenario("api.admin_login", "POST", lambda c: ("/api/login/admin", {"username": "admin", "password": "admin123"}, {})),
+        Scenario("api.doctor_login", "POST", lambda c: ("/api/login/doctor", {"username": c.choice(c.doctor_names), "password": "doctor123"}, {})),
+
+        Scenario("api.get_patients", "GET", lambda c: (f"/api/patients?limit=50&after={c.choice(c.patient_ids)}", None, {})),
+        Scenario("api.create_patient", "POST", lambda c: ("/api/patients", {"name": "Load Test", "age": 40}, ADMIN), (201,), keep="patients"),
+        Scenario("api.update_patient", "PATCH", lambda c: (f"/api/patients/{c.choice(c.patient_ids)}", {"name": "Load Test", "age": 41}, ADMIN)),
+        Scenario("api.bulk_create_patients", "POST", lambda c: ("/api/patients/bulk", [{"name": f"Bulk {i}", "age": i % 90} for i in range(100)], ADMIN), (201,)),
+        Scenario("api.bulk_delete_patients", "DELETE", lambda c: ("/api/patients/bulk", {"filter": {"name": f"Bulk {c.choice(range(100))}"}}, ADMIN)),
+        Scenario("api.delete_patient", "DELETE", lambda c: (f"/api/patients/{_existing('patients')(c)}", None, ADMIN), (204,)),
+
+        Scenario("api.get_doctors", "GET", lambda c: (f"/api/doctors?limit=50&after={c.choice(c.doctor_ids)}", None, {})),
+        Scenario("api.create_doctor", "POST", lambda c: ("/api/doctors", {"name": "Dr. Load", "specialization": "Cardiology"}, ADMIN), (201,), keep="doctors"),
+        Scenario("api.update_doctor", "PATCH", lambda c: (f"/api/doctors/{c.choice(c.created['doctors'])}", {"name": "Dr. Load", "specialization": "Neurology"}, ADMIN)),
+        Scenario("api.bulk_create_doctors", "POST", lambda c: ("/api/doctors/bulk", [{"name": f"Dr. Bulk {i}", "specialization": "Oncology"} for i in range(100)], ADMIN), (201,)),
+        Scenario("api.get_doctor_availability", "GET", lambda c: (f"/api/doctors/{c.choice(c.doctor_ids)}/availability?date_from={week}&date_to={week + timedelta(days=6)}", None, {})),
+        Scenario("api.get_availability", "GET", lambda c: (f"/api/availability?specialization=Cardiology&date_from={week}&date_to={week}", None, {})),
+        Scenario("api.bulk_delete_doctors", "DELETE", lambda c: ("/api/doctors/bulk", {"filter": {"name": f"Dr. Bulk {c.choice(range(100))}"}}, ADMIN)),
+        Scenario("api.delete_doctor", "DELETE", lambda c: (f"/api/doctors/{_existing('doctors')(c)}", None, ADMIN), (204,)),
+
+        Scenario("api.get_appointments", "GET", lambda c: (f"/api/appointments?doctor_id={c.choice(c.doctor_ids)}&limit=50", None, {})),
+        Scenario("api.export_appointments", "GET", lambda c: (f"/api/appointments/export?doctor_id={c.choice(c.doctor_ids)}", None, {})),
+        Scenario("api.create_appointment", "POST", lambda c: ("/api/appointments", c.booking(), ADMIN), (201,), keep="appointments"),
+        Scenario("api.update_appointment", "PATCH", lambda c: (f"/api/appointments/{c.choice(c.created['appointments'])}", c.booking(), ADMIN)),
+        Scenario("api.update_appointment_status", "PATCH", lambda c: (f"/api/appointments/{c.choice(c.created['appointments'])}/status", {"status": "confirmed"}, DOCTOR)),
+        Scenario("api.bulk_update_appointment_status", "PATCH", lambda c: ("/api/appointments/status", {"status": "confirmed", "filter": {"doctor_id": c.choice(c.doctor_ids), "date": "2025-03-03", "status": "pending"}}, DOCTOR)),
+        Scenario("api.bulk_create_appointments", "POST", lambda c: ("/api/appointments/bulk", [c.booking() for _ in range(100)], ADMIN), (201,)),
+        Scenario("api.bulk_delete_appointments", "DELETE", lambda c: ("/api/appointments/bulk", {"filter": {"doctor_id": c.choice(c.doctor_ids), "date": "2025-03-04"}}, ADMIN)),
+        Scenario("api.delete_appointment", "DELETE", lambda c: (f"/api/appointments/{_existing('appointments')(c)}", None, ADMIN), (204,)),
+
+        Scenario("api.search_records", "GET", lambda c: (f"/api/search?q={c.choice(c.doctor_names).split()[1][:3]}&limit=10", None, {})),
+        Scenario("api.get_aggregates", "GET", lambda c: (f"/api/aggregates?date_from={week}&date_to={week + timedelta(days=30)}", None, {})),
+        Scenario("api.get_changes", "GET", lambda c: (f"/api/changes?doctor_id={c.choice(c.doctor_ids)}&limit=100", None, {})),
+        Scenario("api.stream_changes", "GET", lambda c: (f"/api/changes/stream?since=0&doctor_id={c.choice(c.doctor_ids)}&timeout=0", None, {})),
+
+        Scenario("api.get_cache_stats", "GET", lambda c: ("/api/cache/stats", None, ADMIN)),
+    ]
+
+
+# -----------------------------
+# Transports
+# -----------------------------
+
+class TestClientTransport:
+    name = "client"
+
+    def __init__(self, app):
+        self.app = app
+
+    def session(self):
+        client = self.app.test_client()
+
+        def send(method, path, body, headers):
+            response = client.open(path, method=method, json=body, headers=headers)
+            return response.status_code, response.get_data()
+        return send
+
+
+class WSGITransport:
+    name = "wsgi"
+
+    def __init__(self, app):
+        from werkzeug.serving import make_server
+
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        self.server = make_server("127.0.0.1", 0, app, threaded=True)
+        self.port = self.server.server_port
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def session(self):
+        local = threading.local()
+
+        def send(method, path, body, headers):
+            if not hasattr(local, "conn"):
+                local.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+            payload = json.dumps(body).encode() if body is not None else None
+            headers = {**headers, "Content-Type": "application/json"} if payload is not None else headers
+            local.conn.request(method, path, body=payload, headers=headers)
+            response = local.conn.getresponse()
+            return response.status, response.read()
+        return send
+
+    def close(self):
+        self.server.shutdown()
+
+
+# -----------------------------
+# Runner
+# -----------------------------
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    return samples[max(0, math.ceil(pct / 100 * len(samples)) - 1)]
+
+
+def run_scenario(scenario, ctx, send, requests, concurrency):
+    def one(_):
+        path, body, headers = scenario.build(ctx)
+        started = time.perf_counter()
+        status, content = send(scenario.method, path, body, headers)
+        elapsed = (time.perf_counter() - started) * 1000
+        if scenario.keep and status in scenario.expect:
+            ctx.created[scenario.keep].append(json.loads(content)["id"])
+        return elapsed, status
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(one, range(requests)))
+    else:
+        results = [one(i) for i in range(requests)]
+    wall = time.perf_counter() - started
+
+    latencies = sorted(elapsed for elapsed, _ in results)
+    failures = [status for _, status in results if status not in scenario.expect]
+    return {
+        "method": scenario.method,
+        "requests": requests,
+        "errors": len(failures),
+        "error_statuses": sorted(set(failures)),
+        "rps": round(requests / wall, 1),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+
+def print_report(mode, results):
+    print(f"\n== {mode} ==")
+    print(f"{'endpoint':<34} {'method':<7} {'n':>6} {'err':>4} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for endpoint, r in results.items():
+        print(f"{endpoint:<34} {r['method']:<7} {r['requests']:>6} {r['errors']:>4} {r['rps']:>9.1f} "
+              f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f}")
+
+
+def check(all_results, thresholds, baseline, max_regression):
+    problems = []
+    default_budget = thresholds.get("default_p95_ms")
+    budgets = thresholds.get("p95_ms", {})
+    for mode, results in all_results.items():
+        for endpoint, r in results.items():
+            if r["errors"]:
+                problems.append(f"[{mode}] {endpoint}: {r['errors']} failed requests (status {r['error_statuses']})")
+            budget = budgets.get(endpoint, default_budget)
+            if budget is not None and r["p95_ms"] > budget:
+                problems.append(f"[{mode}] {endpoint}: p95 {r['p95_ms']:.1f} ms exceeds budget {budget} ms")
+            previous = (baseline or {}).get(mode, {}).get(endpoint)
+            if previous and r["p95_ms"] > previous["p95_ms"] * (1 + max_regression):
+                problems.append(f"[{mode}] {endpoint}: p95 {r['p95_ms']:.1f} ms regressed from {previous['p95_ms']:.1f} ms")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=("client", "wsgi", "both"), default="both")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=4, help="client threads in wsgi mode")
+    parser.add_argument("--doctors", type=int, default=200)
+    parser.add_argument("--patients", type=int, default=10_000)
+    parser.add_argument("--appointments", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--thresholds", default=THRESHOLDS_FILE)
+    parser.add_argument("--save", help="write results as JSON for later --compare")
+    parser.add_argument("--compare", help="results JSON from a previous run")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="allowed p95 growth vs --compare")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="load-test-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'load.db')}"
+
+    from server import app
+    from extensions import db
+    from models import Doctor
+    from benchmarks.synthetic import generate
+
+    scenarios = build_scenarios()
+    covered = {s.endpoint for s in scenarios}
+    missing = sorted(rule.endpoint for rule in app.url_map.iter_rules()
+                     if rule.endpoint.startswith("api.") and rule.endpoint not in covered)
+    if missing:
+        sys.exit(f"No load-test scenario for: {', '.join(missing)}")
+
+    with app.app_context():
+        started = time.perf_counter()
+        ids = generate(db, args.doctors, args.patients, args.appointments, args.seed)
+        names = list(db.session.scalars(db.select(Doctor.name).where(Doctor.id.in_(ids["doctor_ids"][:1000]))))
+        print(f"Generated {args.doctors} doctors, {args.patients} patients, {args.appointments} appointments "
+              f"in {time.perf_counter() - started:.1f}s ({workdir})")
+
+    modes = ("client", "wsgi") if args.mode == "both" else (args.mode,)
+    all_results = {}
+    # Shared across modes so later bookings keep taking fresh slots
+    ctx = Context(ids["doctor_ids"], ids["patient_ids"], names, args.seed)
+    for mode in modes:
+        transport = TestClientTransport(app) if mode == "client" else WSGITransport(app)
+        concurrency = args.concurrency if mode == "wsgi" else 1
+        send = transport.session()
+        all_results[mode] = {
+            s.endpoint: run_scenario(s, ctx, send, args.requests, concurrency) for s in scenarios
+        }
+        if mode == "wsgi":
+            transport.close()
+        print_report(mode, all_results[mode])
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(all_results, f, indent=2)
+    with open(args.thresholds) as f:
+        thresholds = json.load(f)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    problems = check(all_results, thresholds, baseline, args.max_regression)
+    if problems:
+        print("\nFAILED:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print("\nAll endpoints within thresholds.")
+
+
+if __name__ == "__main__":
+    main()
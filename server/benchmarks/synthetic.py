@@ -0,0 +1,119 @@
+"""Deterministic synthetic clinic data, bulk-inserted in chunks.
+
+Run from the ``server`` directory to fill a database::
+
+    python -m benchmarks.synthetic --database-url sqlite:///big.db \\
+        --doctors 10000 --patients 200000 --appointments 1000000 --seed 42
+
+The same seed and sizes always produce the same rows. Appointments never
+double-book a doctor, so the data also satisfies the scheduling checks.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+
+SPECIALIZATIONS = ["Cardiology", "Dermatology", "Neurology", "Pediatrics", "Oncology",
+                   "Orthopedics", "Psychiatry", "Radiology", "Urology", "Ophthalmology"]
+FIRST_NAMES = ["Alice", "Bob", "Carol", "David", "Eve", "Frank", "Grace", "Hassan", "Ivy", "James",
+               "Kamau", "Linda", "Mohamed", "Njeri", "Omar", "Priya", "Quinn", "Rosa", "Sam", "Terry"]
+LAST_NAMES = ["Smith", "Lee", "Johnson", "Otieno", "Garcia", "Kim", "Mwangi", "Brown", "Patel", "Yegon"]
+STATUSES = ["pending"] * 5 + ["confirmed"] * 3 + ["completed", "cancelled"]
+REASONS = ["Checkup", "Follow-up", "Consultation", "Lab results", "Vaccination", None]
+
+SLOTS_PER_DAY = 16  # 09:00-17:00 in 30 minute slots
+CHUNK_SIZE = 50_000
+
+
+def _name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _insert_chunks(db, model, rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            db.session.execute(db.insert(model), chunk)
+            db.session.commit()
+            chunk = []
+    if chunk:
+        db.session.execute(db.insert(model), chunk)
+        db.session.commit()
+
+
+def _appointment_rows(rng, doctor_ids, patient_ids, appointments, start):
+    # Spread evenly over doctors; each doctor gets distinct slots
+    per_doctor, extra = divmod(appointments, len(doctor_ids))
+    capacity = max(365, (per_doctor + 1) // SLOTS_PER_DAY + 1) * SLOTS_PER_DAY
+    base = datetime.combine(start, datetime.min.time()).replace(hour=9)
+    for position, doctor_id in enumerate(doctor_ids):
+        count = per_doctor + (1 if position < extra else 0)
+        for slot in rng.sample(range(capacity), count):
+            day, index = divmod(slot, SLOTS_PER_DAY)
+            start_at = base + timedelta(days=day, minutes=30 * index)
+            yield {
+                "date": start_at.date().isoformat(),
+                "time": start_at.strftime("%H:%M"),
+                "start_at": start_at,
+                "status": rng.choice(STATUSES),
+                "reason": rng.choice(REASONS),
+                "patient_id": rng.choice(patient_ids),
+                "doctor_id": doctor_id,
+            }
+
+
+def generate(db, doctors=100, patients=1000, appointments=10_000, seed=42, start=date(2025, 1, 1)):
+    """Insert synthetic doctors, patients and appointments; return their ids.
+
+    Must be called inside an application context. The database is first
+    migrated to the latest schema.
+    """
+    from flask_migrate import upgrade
+    from models import Doctor, Patient, Appointment
+    import aggregates
+
+    upgrade()
+    rng = random.Random(seed)
+    first_doctor = (db.session.scalar(db.select(db.func.max(Doctor.id))) or 0) + 1
+    first_patient = (db.session.scalar(db.select(db.func.max(Patient.id))) or 0) + 1
+
+    _insert_chunks(db, Doctor, (
+        {"name": f"Dr. {_name(rng)} {i}", "specialization": SPECIALIZATIONS[i % len(SPECIALIZATIONS)]}
+        for i in range(doctors)
+    ))
+    _insert_chunks(db, Patient, (
+        {"name": _name(rng), "age": rng.randint(0, 95), "contact": f"patient{i}@example.com"}
+        for i in range(patients)
+    ))
+    doctor_ids = list(db.session.scalars(db.select(Doctor.id).where(Doctor.id >= first_doctor).order_by(Doctor.id)))
+    patient_ids = list(db.session.scalars(db.select(Patient.id).where(Patient.id >= first_patient).order_by(Patient.id)))
+    if appointments and doctor_ids and patient_ids:
+        _insert_chunks(db, Appointment, _appointment_rows(rng, doctor_ids, patient_ids, appointments, start))
+        aggregates.rebuild()
+    return {"doctor_ids": doctor_ids, "patient_ids": patient_ids}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///healthcare.db"))
+    parser.add_argument("--doctors", type=int, default=100)
+    parser.add_argument("--patients", type=int, default=1000)
+    parser.add_argument("--appointments", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url
+    from server import app
+    from extensions import db
+
+    started = time.perf_counter()
+    with app.app_context():
+        generate(db, args.doctors, args.patients, args.appointments, args.seed)
+    print(f"Inserted {args.doctors} doctors, {args.patients} patients, {args.appointments} appointments "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
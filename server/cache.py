@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Returned by backends when a key is absent or expired
+MISSING = object()
+
+
+# -----------------------------
+# Backends
+# -----------------------------
+
+class CacheBackend:
+    """Storage interface for :class:`Cache`.
+
+    Implement these four methods on top of a shared store (Redis, memcached,
+    ...) and pass an instance as ``CACHE_BACKEND`` to share the cache
+    between gunicorn workers.
+    """
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """Bounded in-process LRU with per-entry TTL."""
+
+    def __init__(self, max_entries=1024, default_ttl=300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key, MISSING)
+            if entry is MISSING:
+                return MISSING
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# -----------------------------
+# Extension
+# -----------------------------
+
+class Cache:
+    """Read-through cache keyed by ``(namespace, key)``.
+
+    ``invalidate(namespace)`` drops a whole namespace at once by moving it to
+    a new generation, which works the same on any backend.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryBackend()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        backend = app.config.get("CACHE_BACKEND")
+        if backend is None:
+            backend = MemoryBackend(
+                max_entries=app.config.get("CACHE_MAX_ENTRIES", 1024),
+                default_ttl=app.config.get("CACHE_DEFAULT_TTL", 300),
+            )
+        self.backend = backend
+        app.extensions["cache"] = self
+
+    def _generation(self, namespace):
+        key = f"gen:{namespace}"
+        generation = self.backend.get(key)
+        if generation is MISSING:
+            # Never restart from a value an evicted generation may have used
+            generation = time.time_ns()
+            self.backend.set(key, generation, ttl=0)
+        return generation
+
+    def _key(self, namespace, key):
+        return f"{namespace}:{self._generation(namespace)}:{key}"
+
+    def get(self, namespace, key, default=None):
+        value = self.backend.get(self._key(namespace, key))
+        if value is MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, namespace, key, value, ttl=None):
+        self.backend.set(self._key(namespace, key), value, ttl)
+
+    def delete(self, namespace, key):
+        self.backend.delete(self._key(namespace, key))
+
+    def invalidate(self, namespace):
+        self.backend.set(f"gen:{namespace}", time.time_ns(), ttl=0)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        stats = {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+        if isinstance(self.backend, MemoryBackend):
+            stats.update(size=len(self.backend), max_entries=self.backend.max_entries,
+                         evictions=self.backend.evictions)
+        return stats
@@ -0,0 +1,52 @@
+"""Bookkeeping for appointments removed by ``ON DELETE CASCADE``.
+
+Appointments reference their patient and doctor with ``ON DELETE CASCADE``
+and the relationships use ``passive_deletes``, so deleting a patient or a
+doctor no longer loads its appointments: the database removes them. The
+flush hooks in aggregates.py, changes.py and versions.py never see those
+rows, so before the parent rows go they are subtracted from the daily
+counts and logged to the change feed here, with set-based statements.
+Archived appointments cascade the same way and are accounted for too.
+"""
+from extensions import db
+from models import Appointment, ArchivedAppointment, Doctor, Patient
+import aggregates
+import changes
+import versions
+
+# Parent model -> the appointment column referencing it
+PARENTS = {Patient: "patient_id", Doctor: "doctor_id"}
+
+
+def before_delete(parents, session=None, exclude=()):
+    """Account for the appointments that deleting ``parents`` will cascade to.
+
+    ``parents`` maps ``Patient``/``Doctor`` to a WHERE clause selecting the
+    rows about to be deleted. ``exclude`` holds ids of appointments the
+    session deletes itself (loaded collections are still deleted by the ORM
+    and tracked by the flush hooks). Returns the number of appointments.
+    """
+    session = session if session is not None else db.session
+    removed = 0
+    for appointments in (Appointment, ArchivedAppointment):
+        # One OR'ed criterion, so an appointment of both a deleted patient and a deleted doctor counts once
+        affected = db.or_(*(getattr(appointments, PARENTS[model]).in_(db.select(model.id).where(criteria))
+                            for model, criteria in parents.items()))
+        if exclude and appointments is Appointment:
+            affected = db.and_(affected, Appointment.id.not_in(exclude))
+        aggregates.subtract(affected, session.connection(), appointments)
+        removed += changes.record_deleted(affected, session, appointments)
+    versions.mark_changed(session, "appointments")
+    return removed
+
+
+@db.event.listens_for(db.session, "before_flush")
+def _before_flush(session, flush_context, instances):
+    parents = {}
+    for model in PARENTS:
+        ids = [obj.id for obj in session.deleted if type(obj) is model]
+        if ids:
+            parents[model] = model.id.in_(ids)
+    if parents:
+        deleted = [obj.id for obj in session.deleted if isinstance(obj, Appointment)]
+        before_delete(parents, session, exclude=deleted)
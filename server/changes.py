@@ -0,0 +1,266 @@
+"""Change feed: an append-only log of writes, served as JSON pages and SSE.
+
+Every write to patients, doctors or appointments appends a ``change_log``
+row in the same transaction. ORM flushes are logged by the ``after_flush``
+hook below; statements that bypass the unit of work (bulk import, bulk
+status updates) call ``record()`` themselves, and appointments removed by a
+database cascade or bulk delete are logged with ``record_deleted()``.
+
+Open SSE streams do not query the database. One ``ChangeFeed`` per process
+polls the log (immediately after a local commit, otherwise every
+``CHANGE_FEED_POLL_SECONDS``), keeps recent entries in memory and wakes the
+streams, which filter them by doctor or patient. A client that falls behind
+the buffer is paged from the table instead.
+"""
+import json
+import logging
+import threading
+from bisect import bisect_right
+from collections import deque
+from datetime import date, datetime
+
+from flask import current_app, has_app_context
+from sqlalchemy import inspect
+
+from extensions import db
+from models import Appointment, ChangeLogEntry, Doctor, Patient
+
+logger = logging.getLogger(__name__)
+
+TRACKED = {Patient: "patients", Doctor: "doctors", Appointment: "appointments"}
+RESOURCES = tuple(TRACKED.values())
+
+DEFAULT_POLL_SECONDS = 1.0
+DEFAULT_BUFFER_SIZE = 10_000
+FETCH_SIZE = 1000
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def entry(resource, record_id, action, data=None, doctor_id=None, patient_id=None):
+    """A ``change_log`` row as a parameter dict for ``record()``."""
+    if resource == "doctors":
+        doctor_id = record_id
+    elif resource == "patients":
+        patient_id = record_id
+    return {
+        "resource": resource, "record_id": record_id, "action": action,
+        "doctor_id": doctor_id, "patient_id": patient_id,
+        "data": json.dumps(data, default=_json_default) if data is not None else None,
+    }
+
+
+def record(entries, session=None):
+    """Append entries to the change log inside the current transaction."""
+    if not entries:
+        return
+    session = session if session is not None else db.session
+    session.connection().execute(ChangeLogEntry.__table__.insert(), entries)
+    session.info["changes_logged"] = True
+
+
+def record_deleted(criteria, session=None, model=Appointment):
+    """Log every appointment matching ``criteria`` as deleted, before it is.
+
+    A single ``INSERT ... SELECT``, so large cascades never reach Python.
+    ``model`` may be ``ArchivedAppointment`` for archived rows. Returns the
+    number of appointments logged.
+    """
+    session = session if session is not None else db.session
+    logged = session.connection().execute(ChangeLogEntry.__table__.insert().from_select(
+        ["resource", "record_id", "action", "doctor_id", "patient_id"],
+        db.select(db.literal("appointments"), model.id, db.literal("deleted"),
+                  model.doctor_id, model.patient_id)
+        .where(criteria).order_by(model.id),
+    )).rowcount
+    session.info["changes_logged"] = True
+    return logged
+
+
+def to_dict(row):
+    return {
+        "seq": row.seq, "resource": row.resource, "id": row.record_id, "action": row.action,
+        "doctor_id": row.doctor_id, "patient_id": row.patient_id,
+        "data": json.loads(row.data) if row.data is not None else None,
+        "at": row.created_at.isoformat() if row.created_at else None,
+    }
+
+
+def fetch(after, limit, doctor_id=None, patient_id=None, resource=None):
+    """Entries with ``seq > after`` in order, as dicts."""
+    query = db.select(ChangeLogEntry).where(ChangeLogEntry.seq > after)
+    if doctor_id is not None:
+        query = query.where(ChangeLogEntry.doctor_id == doctor_id)
+    if patient_id is not None:
+        query = query.where(ChangeLogEntry.patient_id == patient_id)
+    if resource is not None:
+        query = query.where(ChangeLogEntry.resource == resource)
+    return [to_dict(row) for row in db.session.scalars(query.order_by(ChangeLogEntry.seq).limit(limit))]
+
+
+def latest_seq():
+    return db.session.scalar(db.select(db.func.max(ChangeLogEntry.seq))) or 0
+
+
+# -----------------------------
+# Write tracking
+# -----------------------------
+
+def _columns(obj):
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs}
+
+
+@db.event.listens_for(db.session, "before_flush")
+def _load_deleted(session, flush_context, instances):
+    # Owners of deleted appointments can't be loaded once the row is gone
+    for obj in session.deleted:
+        if isinstance(obj, Appointment):
+            obj.doctor_id, obj.patient_id  # noqa: B018
+
+
+@db.event.listens_for(db.session, "after_flush")
+def _log_flush(session, flush_context):
+    entries = []
+    for obj in session.new:
+        resource = TRACKED.get(type(obj))
+        if resource:
+            values = _columns(obj)
+            entries.append(entry(resource, obj.id, "created", values,
+                                 values.get("doctor_id"), values.get("patient_id")))
+    for obj in session.dirty:
+        resource = TRACKED.get(type(obj))
+        if not resource or not session.is_modified(obj):
+            continue
+        state = inspect(obj)
+        changed = {attr.key: attr.value for attr in state.attrs
+                   if attr.key in state.mapper.column_attrs and attr.history.has_changes()}
+        if not changed:
+            continue
+        owners = (getattr(obj, "doctor_id", None), getattr(obj, "patient_id", None))
+        entries.append(entry(resource, obj.id, "updated", changed, *owners))
+        if resource == "appointments":
+            # A moved appointment also shows up in the feed of its previous doctor/patient
+            history = state.attrs
+            previous = tuple((history[key].history.deleted or [value])[0]
+                             for key, value in zip(("doctor_id", "patient_id"), owners))
+            if previous != owners:
+                entries.append(entry(resource, obj.id, "updated", changed, *previous))
+    for obj in session.deleted:
+        resource = TRACKED.get(type(obj))
+        if resource:
+            entries.append(entry(resource, obj.id, "deleted", None,
+                                 getattr(obj, "doctor_id", None), getattr(obj, "patient_id", None)))
+    record(entries, session)
+
+
+@db.event.listens_for(db.session, "after_commit")
+def _wake_feed(session):
+    if session.info.pop("changes_logged", False) and has_app_context():
+        feed = current_app.extensions.get("change_feed")
+        if feed is not None:
+            feed.wake()
+
+
+@db.event.listens_for(db.session, "after_rollback")
+def _discard(session):
+    session.info.pop("changes_logged", None)
+
+
+# -----------------------------
+# In-process fan-out
+# -----------------------------
+
+class FeedEntry:
+    __slots__ = ("seq", "resource", "doctor_id", "patient_id", "payload")
+
+    def __init__(self, change):
+        self.seq = change["seq"]
+        self.resource = change["resource"]
+        self.doctor_id = change["doctor_id"]
+        self.patient_id = change["patient_id"]
+        # Encoded once here, not once per subscriber
+        self.payload = json.dumps(change)
+
+    def matches(self, doctor_id=None, patient_id=None, resource=None):
+        return ((doctor_id is None or self.doctor_id == doctor_id)
+                and (patient_id is None or self.patient_id == patient_id)
+                and (resource is None or self.resource == resource))
+
+
+class ChangeFeed:
+    """Polls the change log once per process and wakes every waiting stream."""
+
+    def __init__(self, app):
+        self.app = app
+        self.poll_seconds = app.config.get("CHANGE_FEED_POLL_SECONDS", DEFAULT_POLL_SECONDS)
+        self._buffer = deque(maxlen=app.config.get("CHANGE_FEED_BUFFER", DEFAULT_BUFFER_SIZE))
+        self._seqs = deque(maxlen=self._buffer.maxlen)
+        self._head = 0    # last seq read from the log
+        self._floor = 0   # every entry after this seq is buffered
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        # Started by the first subscriber, so forked workers each get their own
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                with self.app.app_context():
+                    self._head = self._floor = latest_seq()
+                self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+                self._thread.start()
+
+    def head(self):
+        self._ensure_started()
+        return self._head
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    changes = fetch(self._head, FETCH_SIZE)
+            except Exception:
+                logger.exception("Change feed poll failed")
+                continue
+            if not changes:
+                continue
+            with self._cond:
+                for change in changes:
+                    if len(self._buffer) == self._buffer.maxlen:
+                        self._floor = self._seqs[0]
+                    self._buffer.append(FeedEntry(change))
+                    self._seqs.append(change["seq"])
+                self._head = changes[-1]["seq"]
+                self._cond.notify_all()
+            if len(changes) == FETCH_SIZE:
+                self._wake.set()
+
+    def wait(self, after, timeout):
+        """Buffered entries after ``after``, waiting up to ``timeout`` for new ones.
+
+        Returns ``None`` when the buffer no longer reaches back to ``after``.
+        """
+        self._ensure_started()
+        with self._cond:
+            if after < self._floor:
+                return None
+            if self._head <= after:
+                self._cond.wait(timeout)
+            start = bisect_right(self._seqs, after)
+            return [self._buffer[i] for i in range(start, len(self._buffer))]
+
+
+def init_app(app):
+    app.extensions["change_feed"] = ChangeFeed(app)
@@ -1,19 +1,51 @@
-from flask import request, jsonify
+import csv
+import heapq
+import io
+import json
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from flask import Response, current_app, g, make_response, request, jsonify, stream_with_context, url_for
 from functools import wraps
-from extensions import db
-from models import Patient, Doctor, Appointment, PatientSchema, DoctorSchema, AppointmentSchema
+from itertools import islice
+from operator import attrgetter, itemgetter
+from time import monotonic
+from marshmallow import ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
+from extensions import db, cache
+from models import (
+    Patient, Doctor, Appointment, AppointmentDailyCount, ArchivedAppointment,
+    PatientSchema, DoctorSchema, AppointmentSchema, AppointmentDetailSchema,
+    parse_start_at
+)
+from serializers import patient_serializer, doctor_serializer, appointment_serializer
+import aggregates
+import archive
+import cascades
+import changes
+import importers
+import metrics
+import negotiation
+import scheduling
+import search
+import versions
 
 # -----------------------------
 # SCHEMAS
 # -----------------------------
+# Plain list pages go through the column serializers in serializers.py;
+# schemas dump single objects and ?expand= pages with relationships
 patient_schema = PatientSchema()
-patients_schema = PatientSchema(many=True)
+patients_expanded_schema = PatientSchema(many=True)
 
 doctor_schema = DoctorSchema()
-doctors_schema = DoctorSchema(many=True)
+doctors_expanded_schema = DoctorSchema(many=True)
 
 appointment_schema = AppointmentSchema()
-appointments_schema = AppointmentSchema(many=True)
+appointments_expanded_schemas = {
+    frozenset(expand): AppointmentDetailSchema(many=True, exclude=tuple({"patient", "doctor"} - set(expand)))
+    for expand in (("patient",), ("doctor",), ("patient", "doctor"))
+}
 
 # -----------------------------
 # ROLE DECORATOR
@@ -29,12 +61,364 @@ def require_role(role):
         return wrapper
     return decorator
 
+# -----------------------------
+# CONDITIONAL GET DECORATOR
+# -----------------------------
+# ?expand= values pull another resource into the response
+EXPAND_RESOURCES = {'appointments': 'appointments', 'patient': 'patients', 'doctor': 'doctors'}
+
+def conditional(*resources):
+    """Serve ``304 Not Modified`` from the write version counters.
+
+    The ETag is derived from the versions of every resource the response
+    depends on, read in one query, so an unchanged collection is answered
+    before any other query or serialization runs.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            deps = set(resources)
+            for part in request.args.get('expand', '').split(','):
+                if part.strip() in EXPAND_RESOURCES:
+                    deps.add(EXPAND_RESOURCES[part.strip()])
+            stamps = g.resource_versions = versions.current(*deps)
+            etag = '-'.join(f"{r}.{stamps[r][0]}" for r in sorted(deps))
+            last_modified = max(ts for _, ts in stamps.values())
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = since is not None and int(last_modified) <= since.timestamp()
+            if not_modified:
+                response = Response(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            # Weak: gzip, deflate and MessagePack bodies of the same data share it
+            response.set_etag(etag, weak=True)
+            response.last_modified = last_modified
+            response.cache_control.no_cache = True  # always revalidate
+            return response
+        return wrapper
+    return decorator
+
+# -----------------------------
+# PAGINATION & FILTERS
+# -----------------------------
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def _int_arg(name, minimum=0, args=None):
+    value = (request.args if args is None else args).get(name)
+    if value is None or value == '':
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{name}' must be an integer")
+    if value < minimum:
+        raise ValueError(f"'{name}' must be >= {minimum}")
+    return value
+
+
+def _date_arg(name, args=None):
+    value = (request.args if args is None else args).get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{name}' must be a date in YYYY-MM-DD format")
+
+
+def _expand_arg(allowed):
+    value = request.args.get('expand', '')
+    expand = {part.strip() for part in value.split(',') if part.strip()}
+    unknown = expand - set(allowed)
+    if unknown:
+        raise ValueError(f"Cannot expand {', '.join(sorted(unknown))}; allowed: {', '.join(allowed)}")
+    return expand
+
+
+def _page(query, model, after, limit):
+    if after is not None:
+        query = query.filter(model.id > after)
+    # Fetch one extra row to know whether another page exists
+    return query.order_by(model.id).limit(limit + 1).all()
+
+
+def _paginate(query, model, schema=None, serializer=None, archived=None):
+    """Keyset pagination on the primary key.
+
+    Clients pass ``limit`` and the ``after`` cursor returned in the
+    ``X-Next-Cursor`` header of the previous page. The body stays a plain
+    JSON array, but callers that never pass ``limit`` only get the first
+    ``DEFAULT_PAGE_SIZE`` rows and must follow the cursor for the rest.
+
+    With a ``serializer`` only the ``?fields=`` columns are selected and
+    dumped from row tuples; ``schema`` dumps ORM objects (used for ?expand=).
+    ``archived`` is the same query on ``ArchivedAppointment``, merged in by id.
+    """
+    limit = _int_arg('limit', minimum=1) or DEFAULT_PAGE_SIZE
+    limit = min(limit, MAX_PAGE_SIZE)
+    after = _int_arg('after')
+
+    if serializer is not None:
+        fields = serializer.parse_fields(request.args.get('fields'))
+        query = query.with_entities(*serializer.entities(fields))
+        if archived is not None:
+            archived = archived.with_entities(
+                *(getattr(ArchivedAppointment, column.key) for column in serializer.entities(fields)))
+    elif 'fields' in request.args:
+        raise ValueError("'fields' cannot be combined with 'expand'")
+    rows = _page(query, model, after, limit)
+    if archived is not None:
+        # Archived appointments keep their ids, so both keyset pages merge by id
+        key = itemgetter(0) if serializer is not None else attrgetter('id')
+        rows = list(heapq.merge(rows, _page(archived, ArchivedAppointment, after, limit), key=key))[:limit + 1]
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    with metrics.timed_serialization():
+        if serializer is not None:
+            response = jsonify(serializer.dump(rows, fields))
+        else:
+            response = schema.jsonify(rows)
+    if has_more:
+        next_cursor = rows[-1][0] if serializer is not None else rows[-1].id
+        args = request.args.to_dict()
+        args['after'] = next_cursor
+        response.headers['X-Next-Cursor'] = str(next_cursor)
+        response.headers['Link'] = f'<{url_for(request.endpoint, **args)}>; rel="next"'
+    return response, 200
+
+
+def _filter_appointments(query, args=None, model=Appointment):
+    """Apply the appointment list filters from ``args`` (default: the query string).
+
+    ``model`` is ``ArchivedAppointment`` when filtering the archive.
+    """
+    args = request.args if args is None else args
+    doctor_id = _int_arg('doctor_id', args=args)
+    if doctor_id is not None:
+        query = query.filter(model.doctor_id == doctor_id)
+    patient_id = _int_arg('patient_id', args=args)
+    if patient_id is not None:
+        query = query.filter(model.patient_id == patient_id)
+    status = args.get('status')
+    if status:
+        query = query.filter(model.status == status)
+    date_from = _date_arg('date_from', args=args)
+    if date_from:
+        query = query.filter(model.start_at >= datetime.combine(date_from, time.min))
+    date_to = _date_arg('date_to', args=args)
+    if date_to:
+        # Inclusive of the whole end day
+        query = query.filter(model.start_at < datetime.combine(date_to + timedelta(days=1), time.min))
+    return query
+
+# -----------------------------
+# CACHED LOOKUPS
+# -----------------------------
+# Only hits are cached, so only renames and deletes need invalidation
+def patient_exists(patient_id):
+    if cache.get('patients', patient_id):
+        return True
+    found = db.session.query(Patient.id).filter_by(id=patient_id).first() is not None
+    if found:
+        cache.set('patients', patient_id, True)
+    return found
+
+def doctor_exists(doctor_id):
+    if cache.get('doctors', doctor_id):
+        return True
+    found = db.session.query(Doctor.id).filter_by(id=doctor_id).first() is not None
+    if found:
+        cache.set('doctors', doctor_id, True)
+    return found
+
+def doctor_id_by_name(name):
+    doctor_id = cache.get('doctor-names', name)
+    if doctor_id is None:
+        row = db.session.query(Doctor.id).filter_by(name=name).first()
+        if row is None:
+            return None
+        doctor_id = row.id
+        cache.set('doctor-names', name, doctor_id)
+    return doctor_id
+
+# -----------------------------
+# PARTIAL UPDATES
+# -----------------------------
+# Columns a PATCH may set; the row version is bumped by the update itself
+UPDATABLE = {
+    Patient: ('name', 'age', 'contact'),
+    Doctor: ('name', 'specialization'),
+    Appointment: ('date', 'time', 'reason', 'patient_id', 'doctor_id'),
+}
+# Appointment fields that move it to another slot, doctor or patient
+MOVE_FIELDS = ('date', 'time', 'patient_id', 'doctor_id')
+# Un-versioned appointment moves retry when another write got in between
+PATCH_ATTEMPTS = 3
+
+
+def _expected_version(data):
+    """Row version the client last saw, from ``If-Match`` or a ``version`` field."""
+    value = data.pop('version', None)
+    header = request.headers.get('If-Match')
+    if header:
+        value = header.strip().removeprefix('W/').strip('"')
+    if value is None or value == '*':
+        return None  # If-Match: * matches any version of an existing record
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError("'version' must be an integer")
+
+
+def _patch_values(model, schema):
+    """Validated ``(values, expected_version)`` from a partial update body."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        raise ValueError("Body must be a JSON object")
+    data = dict(data)
+    expected = _expected_version(data)
+    unknown = set(data) - set(UPDATABLE[model])
+    if unknown:
+        raise ValueError(f"Cannot update {', '.join(sorted(unknown))}; allowed: {', '.join(UPDATABLE[model])}")
+    if not data:
+        raise ValueError("Nothing to update")
+    errors = schema.validate(data, partial=True)
+    if errors:
+        raise ValidationError(errors)
+    if model is Appointment and ('date' in data or 'time' in data):
+        if 'date' not in data or 'time' not in data:
+            raise ValueError("'date' and 'time' must be sent together")
+        try:
+            data['start_at'] = parse_start_at(data['date'], data['time'])
+        except ValueError:
+            raise ValueError("Invalid date or time")
+    return data, expected
+
+
+def _current_version(model, record_id):
+    return db.session.scalar(db.select(model.version).where(model.id == record_id))
+
+
+def _patch_update(model, record_id, values, expected, entities):
+    """Run the UPDATE; returns ``(row or None, previous appointment key, slot)``."""
+    criteria = [model.id == record_id]
+    if expected is not None:
+        criteria.append(model.version == expected)
+    previous = slot = None
+    if model is Appointment and any(name in values for name in MOVE_FIELDS):
+        previous = db.session.execute(
+            db.select(Appointment.doctor_id, Appointment.patient_id, Appointment.start_at,
+                      Appointment.status, Appointment.version)
+            .where(Appointment.id == record_id)
+        ).first()
+        if previous is None:
+            raise LookupError(record_id)
+        criteria.append(Appointment.version == previous.version)
+        slot = (values.get('doctor_id', previous.doctor_id), values.get('start_at', previous.start_at))
+        if slot != (previous.doctor_id, previous.start_at):
+            criteria.append(~scheduling.conflict_exists(*slot, exclude_id=record_id))
+
+    statement = (db.update(model).where(*criteria).values(**values, version=model.version + 1)
+                 .returning(*entities)
+                 .execution_options(synchronize_session=False))
+    return db.session.execute(statement).first(), previous, slot
+
+
+def _patch_failed(model, record_id, expected, slot=None):
+    # Only reached when the UPDATE matched nothing, so the happy path stays one statement
+    current = _current_version(model, record_id)
+    if current is None:
+        return jsonify({"message": f"{model.__name__} not found"}), 404
+    if slot is not None and (expected is None or expected == current):
+        conflict_id = scheduling.find_conflict(*slot, exclude_id=record_id)
+        if conflict_id:
+            return jsonify({"message": "Doctor is already booked at this time", "conflict_id": conflict_id}), 409
+    return jsonify({"message": f"{model.__name__} was modified; reload and retry", "version": current}), 412
+
+
+def _patch(model, record_id, schema, serializer):
+    """Partial update as one ``UPDATE ... RETURNING``.
+
+    Only the sent fields are written. Patient and doctor ids are checked by
+    the foreign keys, and an ``If-Match`` version that is no longer current
+    fails with 412. Moving an appointment first reads its old slot, which the
+    daily counts and the change feed need (RETURNING only sees new values);
+    the update is then guarded by the version read.
+    """
+    try:
+        values, expected = _patch_values(model, schema)
+    except ValidationError as e:
+        return jsonify(e.messages), 400
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    fields = serializer.parse_fields(None)
+    for _ in range(PATCH_ATTEMPTS):
+        try:
+            row, previous, slot = _patch_update(model, record_id, values, expected, serializer.entities(fields))
+        except LookupError:
+            return jsonify({"message": f"{model.__name__} not found"}), 404
+        except IntegrityError as e:
+            db.session.rollback()
+            if 'foreign key' not in str(e.orig).lower():
+                raise
+            return jsonify({"message": "Patient or Doctor not found"}), 404
+        if row is not None:
+            break
+        db.session.rollback()
+        # Without If-Match a move that lost a race to another write is simply retried
+        if expected is not None or previous is None or _current_version(model, record_id) == previous.version:
+            return _patch_failed(model, record_id, expected, slot)
+    else:
+        return _patch_failed(model, record_id, expected, slot)
+
+    # The UPDATE bypasses the flush hooks: feed the change log and daily counts here
+    new = row._mapping
+    body = serializer.dump([row], fields)[0]
+    owners = (new.get('doctor_id'), new.get('patient_id'))
+    data = {name: body[name] for name in (*values, 'version')}
+    entries = [changes.entry(model.__tablename__, record_id, 'updated', data, *owners)]
+    if previous is not None:
+        if (previous.doctor_id, previous.patient_id) != owners:
+            entries.append(changes.entry('appointments', record_id, 'updated', data,
+                                         previous.doctor_id, previous.patient_id))
+        deltas = Counter()
+        deltas[aggregates.key(previous.doctor_id, previous.start_at, previous.status)] -= 1
+        deltas[aggregates.key(new['doctor_id'], new['start_at'], new['status'])] += 1
+        aggregates.apply(deltas)
+    changes.record(entries)
+    db.session.commit()
+
+    if model is Doctor:
+        if 'name' in values:
+            cache.invalidate('doctor-names')
+        cache.invalidate('doctor-list')
+    response = jsonify(body)
+    response.set_etag(str(new['version']))
+    return response, 200
+
 # -----------------------------
 # PATIENT ENDPOINTS
 # -----------------------------
+@conditional('patients')
 def get_patients():
-    patients = Patient.query.all()
-    return patients_schema.jsonify(patients), 200
+    try:
+        if 'appointments' in _expand_arg(('appointments',)):
+            # One extra SELECT ... WHERE patient_id IN (page ids) for the whole page
+            query = Patient.query.options(selectinload(Patient.appointments))
+            return _paginate(query, Patient, patients_expanded_schema)
+        return _paginate(Patient.query, Patient, serializer=patient_serializer)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
 
 @require_role('admin')
 def create_patient():
@@ -49,17 +433,7 @@ def create_patient():
 
 @require_role('admin')
 def update_patient(patient_id):
-    patient = Patient.query.get(patient_id)
-    if not patient:
-        return jsonify({"message": "Patient not found"}), 404
-    data = request.get_json()
-    errors = patient_schema.validate(data)
-    if errors:
-        return jsonify(errors), 400
-    patient.name = data['name']
-    patient.age = data['age']
-    db.session.commit()
-    return patient_schema.jsonify(patient), 200
+    return _patch(Patient, patient_id, patient_schema, patient_serializer)
 
 @require_role('admin')
 def delete_patient(patient_id):
@@ -68,14 +442,37 @@ def delete_patient(patient_id):
         return jsonify({"message": "Patient not found"}), 404
     db.session.delete(patient)
     db.session.commit()
+    cache.delete('patients', patient_id)
     return '', 204
 
 # -----------------------------
 # DOCTOR ENDPOINTS
 # -----------------------------
+@conditional('doctors')
 def get_doctors():
-    doctors = Doctor.query.all()
-    return doctors_schema.jsonify(doctors), 200
+    try:
+        if 'appointments' in _expand_arg(('appointments',)):
+            query = Doctor.query.options(selectinload(Doctor.appointments))
+            return _paginate(query, Doctor, doctors_expanded_schema)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    # The plain doctor list rarely changes: keep the serialized page. The key
+    # carries the shared doctors version (read by @conditional), so a write
+    # made by another worker is never answered from this worker's cache.
+    version, _ = g.resource_versions['doctors']
+    cache_key = f"{version} {negotiation.response_mimetype()} {request.query_string.decode()}"
+    cached = cache.get('doctor-list', cache_key)
+    if cached is not None:
+        body, mimetype, headers = cached
+        return Response(body, mimetype=mimetype, headers=headers), 200
+    try:
+        response, status = _paginate(Doctor.query, Doctor, serializer=doctor_serializer)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    headers = {key: response.headers[key] for key in ('X-Next-Cursor', 'Link') if key in response.headers}
+    cache.set('doctor-list', cache_key, (response.get_data(), response.mimetype, headers))
+    return response, status
 
 @require_role('admin')
 def create_doctor():
@@ -86,37 +483,51 @@ def create_doctor():
     new_doctor = Doctor(name=data['name'], specialization=data['specialization'])
     db.session.add(new_doctor)
     db.session.commit()
+    cache.invalidate('doctor-list')
     return doctor_schema.jsonify(new_doctor), 201
 
 @require_role('admin')
 def update_doctor(doctor_id):
-    doctor = Doctor.query.get(doctor_id)
-    if not doctor:
-        return jsonify({"message": "Doctor not found"}), 404
-    data = request.get_json()
-    errors = doctor_schema.validate(data)
-    if errors:
-        return jsonify(errors), 400
-    doctor.name = data['name']
-    doctor.specialization = data['specialization']
-    db.session.commit()
-    return doctor_schema.jsonify(doctor), 200
+    return _patch(Doctor, doctor_id, doctor_schema, doctor_serializer)
 
 @require_role('admin')
 def delete_doctor(doctor_id):
     doctor = Doctor.query.get(doctor_id)
     if not doctor:
         return jsonify({"message": "Doctor not found"}), 404
+    name = doctor.name
     db.session.delete(doctor)
     db.session.commit()
+    cache.delete('doctors', doctor_id)
+    cache.delete('doctor-names', name)
+    cache.invalidate('doctor-list')
     return '', 204
 
 # -----------------------------
 # APPOINTMENT ENDPOINTS
 # -----------------------------
+def _archived_appointments():
+    """The list filters applied to the archive, or ``None`` if no archived row can match."""
+    if not archive.reaches(_date_arg('date_from'), request.args.get('status')):
+        return None
+    return _filter_appointments(ArchivedAppointment.query, model=ArchivedAppointment)
+
+@conditional('appointments')
 def get_appointments():
-    appointments = Appointment.query.all()
-    return appointments_schema.jsonify(appointments), 200
+    try:
+        expand = _expand_arg(('patient', 'doctor'))
+        query = _filter_appointments(Appointment.query)
+        archived = _archived_appointments()
+        if not expand:
+            return _paginate(query, Appointment, serializer=appointment_serializer, archived=archived)
+        # Many-to-one: join into the page query instead of a second round trip
+        for name in expand:
+            query = query.options(joinedload(getattr(Appointment, name)))
+            if archived is not None:
+                archived = archived.options(joinedload(getattr(ArchivedAppointment, name)))
+        return _paginate(query, Appointment, appointments_expanded_schemas[frozenset(expand)], archived=archived)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
 
 @require_role('admin')
 def create_appointment():
@@ -124,36 +535,37 @@ def create_appointment():
     errors = appointment_schema.validate(data)
     if errors:
         return jsonify(errors), 400
+    try:
+        start_at = parse_start_at(data['date'], data['time'])
+    except ValueError:
+        return jsonify({"message": "Invalid date or time"}), 400
 
-    patient = Patient.query.get(data['patient_id'])
-    doctor = Doctor.query.get(data['doctor_id'])
-    if not patient or not doctor:
+    if not patient_exists(data['patient_id']) or not doctor_exists(data['doctor_id']):
         return jsonify({"message": "Patient or Doctor not found"}), 404
+    scheduling.lock_doctors([data['doctor_id']])
+    conflict_id = scheduling.find_conflict(data['doctor_id'], start_at)
+    if conflict_id:
+        db.session.rollback()
+        return jsonify({"message": "Doctor is already booked at this time", "conflict_id": conflict_id}), 409
 
-    new_appt = Appointment(date=data['date'], time=data['time'], patient=patient, doctor=doctor)
+    new_appt = Appointment(date=data['date'], time=data['time'],
+                           patient_id=data['patient_id'], doctor_id=data['doctor_id'])
     db.session.add(new_appt)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if 'foreign key' not in str(e.orig).lower():
+            raise
+        # A cached hit outlived a delete made by another worker or outside the API
+        cache.delete('patients', data['patient_id'])
+        cache.delete('doctors', data['doctor_id'])
+        return jsonify({"message": "Patient or Doctor not found"}), 404
     return appointment_schema.jsonify(new_appt), 201
 
 @require_role('admin')
 def update_appointment(appointment_id):
-    appt = Appointment.query.get(appointment_id)
-    if not appt:
-        return jsonify({"message": "Appointment not found"}), 404
-    data = request.get_json()
-    errors = appointment_schema.validate(data)
-    if errors:
-        return jsonify(errors), 400
-    patient = Patient.query.get(data['patient_id'])
-    doctor = Doctor.query.get(data['doctor_id'])
-    if not patient or not doctor:
-        return jsonify({"message": "Patient or Doctor not found"}), 404
-    appt.date = data['date']
-    appt.time = data['time']
-    appt.patient = patient
-    appt.doctor = doctor
-    db.session.commit()
-    return appointment_schema.jsonify(appt), 200
+    return _patch(Appointment, appointment_id, appointment_schema, appointment_serializer)
 
 @require_role('admin')
 def delete_appointment(appointment_id):
@@ -163,3 +575,545 @@ def delete_appointment(appointment_id):
     db.session.delete(appt)
     db.session.commit()
     return '', 204
+
+# -----------------------------
+# AVAILABILITY ENDPOINTS
+# -----------------------------
+def _availability_response(doctor_ids):
+    date_from = _date_arg('date_from')
+    date_to = _date_arg('date_to')
+    if not date_from or not date_to:
+        raise ValueError("'date_from' and 'date_to' are required")
+    free = scheduling.availability(doctor_ids, date_from, date_to)
+    return jsonify([
+        {"doctor_id": doctor_id, "slots": [slot.isoformat(timespec='minutes') for slot in slots]}
+        for doctor_id, slots in free.items()
+    ]), 200
+
+@conditional('doctors', 'appointments')
+def get_doctor_availability(doctor_id):
+    if not Doctor.query.get(doctor_id):
+        return jsonify({"message": "Doctor not found"}), 404
+    try:
+        return _availability_response([doctor_id])
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+@conditional('doctors', 'appointments')
+def get_availability():
+    specialization = request.args.get('specialization')
+    if not specialization:
+        return jsonify({"message": "'specialization' is required"}), 400
+    try:
+        return _availability_response(scheduling.doctor_ids_for_specialization(specialization))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+# -----------------------------
+# EXPORT ENDPOINTS
+# -----------------------------
+EXPORT_BATCH_SIZE = 1000
+EXPORT_COLUMNS = ('id', 'date', 'time', 'start_at', 'status', 'reason', 'patient_id', 'doctor_id')
+
+
+def _export_batches(queries):
+    # yield_per keeps a server-side cursor open and fetches in batches,
+    # so only one batch of row tuples is held in memory at a time
+    results = [db.session.execute(query.statement, execution_options={'yield_per': EXPORT_BATCH_SIZE})
+               for query in queries]
+    # Every query is ordered by id (the first column): merging keeps the export in id order
+    rows = results[0] if len(results) == 1 else heapq.merge(*results, key=itemgetter(0))
+    while partition := list(islice(rows, EXPORT_BATCH_SIZE)):
+        yield [
+            [value.isoformat() if isinstance(value, datetime) else value for value in row]
+            for row in partition
+        ]
+
+
+def _ndjson_stream(queries):
+    for batch in _export_batches(queries):
+        with metrics.timed_serialization():
+            chunk = ''.join(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + '\n' for row in batch)
+        yield chunk
+
+
+def _csv_stream(queries):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+    for batch in _export_batches(queries):
+        with metrics.timed_serialization():
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(batch)
+        yield buffer.getvalue()
+
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', _ndjson_stream),
+    'csv': ('text/csv', _csv_stream),
+}
+
+
+@conditional('appointments')
+def export_appointments():
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"message": f"Unsupported format; use one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        # Build (and validate) the queries before streaming starts
+        sources = [(Appointment, _filter_appointments(Appointment.query))]
+        archived = _archived_appointments()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    if archived is not None:
+        sources.append((ArchivedAppointment, archived))
+    queries = [query.with_entities(*(getattr(model, c) for c in EXPORT_COLUMNS)).order_by(model.id)
+               for model, query in sources]
+
+    mimetype, stream = EXPORT_FORMATS[fmt]
+    return Response(
+        stream_with_context(stream(queries)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=appointments.{fmt}'},
+    )
+
+# -----------------------------
+# BULK IMPORT ENDPOINTS
+# -----------------------------
+def _bulk_import(import_records):
+    try:
+        records = importers.read_records(request)
+        summary = import_records(records)
+    except importers.ImportFormatError as e:
+        return jsonify({"message": str(e)}), 400
+    status = 201 if not summary["errors"] else 200
+    return jsonify(summary), status
+
+@require_role('admin')
+def bulk_create_patients():
+    return _bulk_import(importers.import_patients)
+
+@require_role('admin')
+def bulk_create_doctors():
+    response = _bulk_import(importers.import_doctors)
+    cache.invalidate('doctor-list')
+    return response
+
+@require_role('admin')
+def bulk_create_appointments():
+    return _bulk_import(importers.import_appointments)
+
+# -----------------------------
+# STATUS UPDATES
+# -----------------------------
+MAX_STATUS_UPDATES = 1000
+
+
+def _check_status(status):
+    if status not in scheduling.STATUS_TRANSITIONS:
+        raise ValueError(f"'status' must be one of: {', '.join(scheduling.STATUS_TRANSITIONS)}")
+
+
+def _apply_statuses(criteria, new_status):
+    """One ``UPDATE ... RETURNING``; ``new_status`` may be a SQL expression.
+
+    Returns ``(id, doctor_id, patient_id, start_at)`` of the updated rows.
+    """
+    statement = (db.update(Appointment).where(criteria).values(status=new_status, version=Appointment.version + 1)
+                 .returning(Appointment.id, Appointment.doctor_id, Appointment.patient_id, Appointment.start_at)
+                 .execution_options(synchronize_session=False))
+    return db.session.execute(statement).all()
+
+
+def _status_deltas(rows, old_status, new_status):
+    """Daily count changes for ``rows`` moving between statuses (callables of the id)."""
+    deltas = Counter()
+    for row in rows:
+        deltas[aggregates.key(row.doctor_id, row.start_at, old_status(row.id))] -= 1
+        deltas[aggregates.key(row.doctor_id, row.start_at, new_status(row.id))] += 1
+    return deltas
+
+
+def _log_statuses(rows, new_status):
+    # The UPDATE bypasses the flush hooks, so write the change log entries here
+    changes.record([
+        changes.entry('appointments', row.id, 'updated', {'status': new_status(row.id)}, row.doctor_id, row.patient_id)
+        for row in rows
+    ])
+
+
+def _update_statuses_by_id(items):
+    if len(items) > MAX_STATUS_UPDATES:
+        raise ValueError(f"At most {MAX_STATUS_UPDATES} updates per request")
+    targets = {}
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get('id'), int) or isinstance(item['id'], bool):
+            raise ValueError("Each update needs an integer 'id' and a 'status'")
+        _check_status(item.get('status'))
+        if item['id'] in targets:
+            raise ValueError(f"Appointment {item['id']} is listed more than once")
+        targets[item['id']] = item['status']
+
+    current = dict(db.session.execute(
+        db.select(Appointment.id, Appointment.status).where(Appointment.id.in_(targets))
+    ).all())
+    transitions, unchanged, errors = {}, [], []
+    for appointment_id, status in targets.items():
+        if appointment_id not in current:
+            errors.append({"id": appointment_id, "error": "Appointment not found"})
+        elif current[appointment_id] == status:
+            unchanged.append(appointment_id)
+        elif status not in scheduling.STATUS_TRANSITIONS.get(current[appointment_id], ()):
+            errors.append({"id": appointment_id,
+                           "error": f"Cannot change status from '{current[appointment_id]}' to '{status}'"})
+        else:
+            transitions[appointment_id] = status
+
+    updated = []
+    if transitions:
+        by_status = {}
+        for appointment_id, status in transitions.items():
+            by_status.setdefault(status, []).append(appointment_id)
+        # The transition check is repeated in the WHERE clause, so a row whose
+        # status moved since the read above is left alone
+        criteria = db.or_(*(
+            db.and_(Appointment.id.in_(ids), Appointment.status.in_(scheduling.previous_statuses(status)))
+            for status, ids in by_status.items()
+        ))
+        rows = _apply_statuses(criteria, db.case(transitions, value=Appointment.id))
+        aggregates.apply(_status_deltas(rows, current.get, transitions.get))
+        _log_statuses(rows, transitions.get)
+        updated = sorted(row.id for row in rows)
+        missed = set(transitions) - set(updated)
+        if missed:
+            # Another request got there first; it only conflicts if it set a different status
+            now = dict(db.session.execute(
+                db.select(Appointment.id, Appointment.status).where(Appointment.id.in_(missed))
+            ).all())
+            for appointment_id in sorted(missed):
+                if now.get(appointment_id) == transitions[appointment_id]:
+                    unchanged.append(appointment_id)
+                else:
+                    errors.append({"id": appointment_id, "error": "Status was changed concurrently"})
+    db.session.commit()
+    return {"updated": updated, "unchanged": sorted(unchanged), "errors": errors}
+
+
+def _update_statuses_by_filter(status, filters):
+    _check_status(status)
+    if not isinstance(filters, dict):
+        raise ValueError("'filter' must be an object")
+    if _int_arg('doctor_id', args=filters) is None and _int_arg('patient_id', args=filters) is None:
+        raise ValueError("'filter' needs a 'doctor_id' or 'patient_id'")
+    filters = dict(filters)
+    if filters.get('date'):
+        filters['date_from'] = filters['date_to'] = filters.pop('date')
+    previous = scheduling.previous_statuses(status)
+    if filters.get('status') and filters['status'] not in previous:
+        raise ValueError(f"Cannot change status from '{filters['status']}' to '{status}'")
+
+    criteria = _filter_appointments(Appointment.query, args=filters).whereclause
+    if filters.get('status'):
+        previous = (filters['status'],)
+    # One UPDATE per starting status, so the daily counts know what each row left
+    updated = []
+    for old_status in previous:
+        rows = _apply_statuses(db.and_(criteria, Appointment.status == old_status), status)
+        aggregates.apply(_status_deltas(rows, lambda _: old_status, lambda _: status))
+        _log_statuses(rows, lambda _: status)
+        updated += [row.id for row in rows]
+    db.session.commit()
+    return {"updated": sorted(updated)}
+
+
+@require_role('doctor')
+def update_appointment_status(appointment_id):
+    """Change one appointment's status, following ``scheduling.STATUS_TRANSITIONS``."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or 'status' not in data:
+        return jsonify({"message": "Status field required"}), 400
+    try:
+        result = _update_statuses_by_id([{"id": appointment_id, "status": data['status']}])
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"message": str(e)}), 400
+    if result['errors']:
+        error = result['errors'][0]['error']
+        return jsonify({"message": error}), 404 if error == "Appointment not found" else 409
+    return jsonify({"message": "Status updated successfully"}), 200
+
+@require_role('doctor')
+def bulk_update_appointment_status():
+    """Change many appointment statuses in one transaction.
+
+    The body is either a list of ``{"id", "status"}`` updates, or
+    ``{"status": ..., "filter": {...}}`` taking the list endpoint's filters
+    plus ``date`` for a single day. Every appointment matching the filter that
+    may move to ``status`` is updated.
+    """
+    data = request.get_json(silent=True)
+    try:
+        if isinstance(data, list):
+            return jsonify(_update_statuses_by_id(data)), 200
+        if isinstance(data, dict) and 'filter' in data:
+            return jsonify(_update_statuses_by_filter(data.get('status'), data['filter'])), 200
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"message": str(e)}), 400
+    return jsonify({"message": "Body must be a list of {id, status} updates or {status, filter}"}), 400
+
+# -----------------------------
+# BULK DELETES
+# -----------------------------
+MAX_BULK_DELETES = 1000
+# Columns a patient/doctor delete filter may match (appointments take the list filters)
+DELETE_FILTERS = {Patient: ('name', 'age', 'contact'), Doctor: ('name', 'specialization')}
+
+
+def _delete_criteria(model, data):
+    """WHERE clause for a bulk delete body, plus the requested ids in list mode."""
+    if isinstance(data, list):
+        if len(data) > MAX_BULK_DELETES:
+            raise ValueError(f"At most {MAX_BULK_DELETES} ids per request")
+        if not all(isinstance(item, int) and not isinstance(item, bool) for item in data):
+            raise ValueError("Each id must be an integer")
+        return model.id.in_(data), set(data)
+    if not isinstance(data, dict) or not isinstance(data.get('filter'), dict):
+        raise ValueError("Body must be a list of ids or {filter}")
+    filters = dict(data['filter'])
+    if model is Appointment:
+        if filters.get('date'):
+            filters['date_from'] = filters['date_to'] = filters.pop('date')
+        criteria = _filter_appointments(Appointment.query, args=filters).whereclause
+    else:
+        unknown = set(filters) - set(DELETE_FILTERS[model])
+        if unknown:
+            raise ValueError(f"Cannot filter on {', '.join(sorted(unknown))}; allowed: {', '.join(DELETE_FILTERS[model])}")
+        criteria = db.and_(*(getattr(model, name) == value for name, value in filters.items())) if filters else None
+    # An empty filter would delete the whole table
+    if criteria is None:
+        raise ValueError("'filter' needs at least one criterion")
+    return criteria, None
+
+
+def _bulk_delete(model):
+    """Delete by id list or filter with set-based statements, in one transaction.
+
+    The change log and daily counts are written with ``INSERT ... SELECT`` and
+    grouped updates before the rows go, so nothing is loaded into the session.
+    """
+    try:
+        criteria, requested = _delete_criteria(model, request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    result = {}
+    if model is Appointment:
+        aggregates.subtract(criteria)
+        changes.record_deleted(criteria)
+    else:
+        result['appointments_deleted'] = cascades.before_delete({model: criteria})
+    returning = (model.id, model.name) if model is Doctor else (model.id,)
+    statement = (db.delete(model).where(criteria).returning(*returning)
+                 .execution_options(synchronize_session=False))
+    rows = db.session.execute(statement).all()
+    if model is not Appointment:
+        changes.record([changes.entry(model.__tablename__, row.id, 'deleted') for row in rows])
+    db.session.commit()
+
+    if model is Patient:
+        for row in rows:
+            cache.delete('patients', row.id)
+    elif model is Doctor:
+        for row in rows:
+            cache.delete('doctors', row.id)
+            cache.delete('doctor-names', row.name)
+        cache.invalidate('doctor-list')
+    deleted = sorted(row.id for row in rows)
+    result = {"deleted": deleted, **result}
+    if requested is not None:
+        result['errors'] = [{"id": missing, "error": "Not found"} for missing in sorted(requested - set(deleted))]
+    return jsonify(result), 200
+
+@require_role('admin')
+def bulk_delete_patients():
+    return _bulk_delete(Patient)
+
+@require_role('admin')
+def bulk_delete_doctors():
+    return _bulk_delete(Doctor)
+
+@require_role('admin')
+def bulk_delete_appointments():
+    return _bulk_delete(Appointment)
+
+# -----------------------------
+# SEARCH
+# -----------------------------
+DEFAULT_SEARCH_LIMIT = 10
+
+@conditional('patients', 'doctors')
+def search_records():
+    query = request.args.get('q', '')
+    if not search.terms(query):
+        return jsonify({"message": "'q' is required"}), 400
+    resources = request.args.get('type') or ','.join(search.TARGETS)
+    resources = [part.strip() for part in resources.split(',') if part.strip()]
+    unknown = set(resources) - set(search.TARGETS)
+    if unknown:
+        return jsonify({"message": f"Unknown type {', '.join(sorted(unknown))}; allowed: {', '.join(search.TARGETS)}"}), 400
+    try:
+        limit = _int_arg('limit', minimum=1) or DEFAULT_SEARCH_LIMIT
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    return jsonify({resource: search.search(resource, query, limit) for resource in resources}), 200
+
+# -----------------------------
+# DASHBOARD AGGREGATES
+# -----------------------------
+def _grouped_counts(criteria, column):
+    """``{group: {"counts": {status: n}, "total": n}}`` summed in SQL."""
+    rows = db.session.execute(
+        db.select(column, AppointmentDailyCount.status, db.func.sum(AppointmentDailyCount.count))
+        .where(*criteria)
+        .group_by(column, AppointmentDailyCount.status)
+    )
+    totals = {}
+    for group, status, count in rows:
+        entry = totals.setdefault(group, {"counts": {}, "total": 0})
+        entry["counts"][status] = count
+        entry["total"] += count
+    return totals
+
+@conditional('appointments')
+def get_aggregates():
+    """Appointment counts by status, by doctor and by day, read from the daily counts."""
+    try:
+        doctor_id = _int_arg('doctor_id')
+        date_from = _date_arg('date_from')
+        date_to = _date_arg('date_to')
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    criteria = [AppointmentDailyCount.count != 0]
+    if doctor_id is not None:
+        criteria.append(AppointmentDailyCount.doctor_id == doctor_id)
+    if date_from:
+        criteria.append(AppointmentDailyCount.day >= date_from)
+    if date_to:
+        criteria.append(AppointmentDailyCount.day <= date_to)
+
+    by_doctor = _grouped_counts(criteria, AppointmentDailyCount.doctor_id)
+    by_day = _grouped_counts(criteria, AppointmentDailyCount.day)
+    by_status = {}
+    for entry in by_doctor.values():
+        for status, count in entry["counts"].items():
+            by_status[status] = by_status.get(status, 0) + count
+    return jsonify({
+        "total": sum(by_status.values()),
+        "by_status": by_status,
+        "by_doctor": [{"doctor_id": key, **value} for key, value in sorted(by_doctor.items())],
+        "by_day": [{"date": key.isoformat(), **value} for key, value in sorted(by_day.items())],
+    }), 200
+
+# -----------------------------
+# CHANGE FEED
+# -----------------------------
+# Streams send a comment line this often so proxies keep the connection open
+KEEPALIVE_SECONDS = 15
+
+
+def _change_filters():
+    resource = request.args.get('resource') or None
+    if resource is not None and resource not in changes.RESOURCES:
+        raise ValueError(f"'resource' must be one of: {', '.join(changes.RESOURCES)}")
+    return {"doctor_id": _int_arg('doctor_id'), "patient_id": _int_arg('patient_id'), "resource": resource}
+
+
+def get_changes():
+    """Change log entries after ``?since=<seq>``, oldest first.
+
+    Clients catch up here (or reconnect the stream) with the ``seq`` of the
+    last entry they applied. ``X-Next-Cursor`` is set while more entries remain.
+    """
+    try:
+        filters = _change_filters()
+        since = _int_arg('since') or 0
+        limit = min(_int_arg('limit', minimum=1) or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    entries = changes.fetch(since, limit + 1, **filters)
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    with metrics.timed_serialization():
+        response = jsonify(entries)
+    if has_more:
+        args = request.args.to_dict()
+        args['since'] = entries[-1]["seq"]
+        response.headers['X-Next-Cursor'] = str(entries[-1]["seq"])
+        response.headers['Link'] = f'<{url_for(request.endpoint, **args)}>; rel="next"'
+    return response, 200
+
+
+def _sse(seq, payload):
+    return f"id: {seq}\nevent: change\ndata: {payload}\n\n"
+
+
+def stream_changes():
+    """Server-Sent Events stream of change log entries.
+
+    Starts after ``?since=`` or the ``Last-Event-ID`` a reconnecting
+    EventSource sends, otherwise at the current end of the log. Entries come
+    from the process-wide ``ChangeFeed`` buffer, so an idle stream holds no
+    database connection. ``?timeout=<seconds>`` ends the stream after that
+    long (0 returns once caught up), for clients that long-poll instead.
+    """
+    try:
+        filters = _change_filters()
+        since = _int_arg('since', args={'since': request.headers.get('Last-Event-ID') or request.args.get('since')})
+        timeout = _int_arg('timeout')
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    feed = current_app.extensions['change_feed']
+    if since is None:
+        since = feed.head()
+
+    def generate():
+        last = since
+        deadline = None if timeout is None else monotonic() + timeout
+        while True:
+            remaining = KEEPALIVE_SECONDS if deadline is None else deadline - monotonic()
+            entries = feed.wait(last, max(0, min(remaining, KEEPALIVE_SECONDS)))
+            if entries is None:
+                # Behind the in-memory buffer: page through the table, then
+                # give the connection back before waiting again
+                head = feed.head()
+                page = changes.fetch(last, changes.FETCH_SIZE, **filters)
+                db.session.close()
+                for change in page:
+                    yield _sse(change["seq"], json.dumps(change))
+                if page:
+                    last = page[-1]["seq"]
+                if len(page) < changes.FETCH_SIZE:
+                    # Everything the feed had read is covered by this page
+                    last = max(last, head)
+                continue
+            for entry in entries:
+                if entry.matches(**filters):
+                    yield _sse(entry.seq, entry.payload)
+            if entries:
+                last = entries[-1].seq
+            elif deadline is None:
+                yield ": keepalive\n\n"
+            if deadline is not None and monotonic() >= deadline:
+                return
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# -----------------------------
+# CACHE STATS
+# -----------------------------
+@require_role('admin')
+def get_cache_stats():
+    return jsonify(cache.stats()), 200
@@ -0,0 +1,140 @@
+"""Engine profile: connection pool sizing, SQLite pragmas and an optional read pool.
+
+``configure(app)`` fills ``SQLALCHEMY_ENGINE_OPTIONS`` (and the ``readonly``
+bind) before ``db.init_app``; ``init_app(app)`` then installs the per-connection
+SQLite pragmas on the engines Flask-SQLAlchemy created. With ``DB_READ_POOL``
+enabled, ``RoutingSession`` sends GET/HEAD requests to the read pool so list
+reads never queue behind writers for a connection.
+"""
+import os
+
+from flask import has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+READ_BIND = "readonly"
+READ_METHODS = ("GET", "HEAD")
+# Off by default in SQLite; appointments rely on ON DELETE CASCADE
+FOREIGN_KEYS_PRAGMA = "PRAGMA foreign_keys=ON"
+
+DEFAULTS = {
+    "DB_POOL_SIZE": 10,
+    "DB_MAX_OVERFLOW": 20,
+    "DB_POOL_TIMEOUT": 30,
+    "DB_POOL_RECYCLE": 1800,
+    "DB_READ_POOL": False,
+    "DATABASE_READ_URL": None,
+    "SQLITE_JOURNAL_MODE": "WAL",
+    "SQLITE_SYNCHRONOUS": "NORMAL",
+    "SQLITE_BUSY_TIMEOUT_MS": 5000,
+    "SQLITE_CACHE_SIZE_KB": 65536,
+    "SQLITE_MMAP_SIZE": 256 * 1024 * 1024,
+}
+
+
+def _env(key, default):
+    value = os.getenv(key)
+    if value is None:
+        return default
+    if isinstance(default, bool):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, int):
+        return int(value)
+    return value
+
+
+def _is_sqlite(url):
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def _is_memory(url):
+    url = make_url(url)
+    return url.database in (None, "", ":memory:")
+
+
+def pragmas(config, read_only=False):
+    """PRAGMA statements run on every new SQLite connection."""
+    statements = [FOREIGN_KEYS_PRAGMA]
+    if config["SQLITE_JOURNAL_MODE"]:
+        statements.append(f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}")
+    if config["SQLITE_SYNCHRONOUS"]:
+        statements.append(f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}")
+    statements.append(f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}")
+    if config["SQLITE_CACHE_SIZE_KB"]:
+        # Negative cache_size is in KiB rather than pages
+        statements.append(f"PRAGMA cache_size=-{int(config['SQLITE_CACHE_SIZE_KB'])}")
+    if config["SQLITE_MMAP_SIZE"]:
+        statements.append(f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}")
+    if read_only:
+        statements.append("PRAGMA query_only=ON")
+    return statements
+
+
+def engine_options(url, config):
+    """``create_engine`` keyword arguments for ``url``."""
+    if _is_sqlite(url) and _is_memory(url):
+        return {}  # Flask-SQLAlchemy uses a StaticPool for in-memory SQLite
+    options = {
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+    }
+    if not _is_sqlite(url):
+        options["pool_recycle"] = config["DB_POOL_RECYCLE"]
+        options["pool_pre_ping"] = True
+    return options
+
+
+def configure(app):
+    """Apply the engine profile to ``app.config``; call before ``db.init_app``."""
+    for key, default in DEFAULTS.items():
+        app.config.setdefault(key, _env(key, default))
+    url = app.config["SQLALCHEMY_DATABASE_URI"]
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(url, app.config))
+
+    if app.config["DB_READ_POOL"]:
+        read_url = app.config["DATABASE_READ_URL"] or url
+        if not (_is_sqlite(read_url) and _is_memory(read_url)):
+            binds = app.config.setdefault("SQLALCHEMY_BINDS", {})
+            binds.setdefault(READ_BIND, {"url": read_url, **engine_options(read_url, app.config)})
+
+
+def _install_pragmas(engine, statements):
+    @event.listens_for(engine, "connect")
+    def _apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+def init_app(app, db):
+    """Install SQLite pragmas on the app's engines; call after ``db.init_app``."""
+    with app.app_context():
+        for key, engine in db.engines.items():
+            if engine.dialect.name != "sqlite":
+                continue
+            if _is_memory(engine.url):
+                _install_pragmas(engine, [FOREIGN_KEYS_PRAGMA])
+            else:
+                _install_pragmas(engine, pragmas(app.config, read_only=key == READ_BIND))
+
+
+class RoutingSession(Session):
+    """Session that reads through the ``readonly`` bind during GET/HEAD requests.
+
+    Flushes always go to the primary engine, so a stray write in a read request
+    still works against the primary (and a write on the read pool is refused by
+    SQLite's ``query_only`` pragma).
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and has_request_context()
+                and request.method in READ_METHODS):
+            engine = self._db.engines.get(READ_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
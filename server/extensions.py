@@ -1,5 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_marshmallow import Marshmallow
+from flask_migrate import Migrate
 
-db = SQLAlchemy()
+from cache import Cache
+from database import RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 ma = Marshmallow()
+cache = Cache()
+migrate = Migrate()
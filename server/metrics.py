@@ -0,0 +1,194 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from extensions import cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOW_REQUEST_MS = 500
+MAX_LOGGED_STATEMENTS = 50
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+# -----------------------------
+# Prometheus primitives
+# -----------------------------
+
+def _labels(names, values):
+    pairs = ",".join(f'{name}="{str(value).replace(chr(34), chr(39))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name, self.help, self.labelnames = name, help_text, labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DURATION_BUCKETS):
+        self.name, self.help, self.labelnames, self.buckets = name, help_text, labelnames, buckets
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.setdefault(labels, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = (*self.labelnames, "le")
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_labels(names, (*labels, bound))} {count}")
+                lines.append(f"{self.name}_bucket{_labels(names, (*labels, '+Inf'))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-2]:.6f}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+ROUTE_LABELS = ("method", "route")
+
+requests_total = Counter("http_requests_total", "HTTP requests handled.", (*ROUTE_LABELS, "status"))
+request_duration = Histogram("http_request_duration_seconds", "Total request time.", ROUTE_LABELS)
+sql_duration = Histogram("http_request_sql_duration_seconds", "Time spent in SQL per request.", ROUTE_LABELS)
+serialization_duration = Histogram("http_request_serialization_duration_seconds",
+                                   "Time spent serializing response bodies per request.", ROUTE_LABELS)
+sql_queries = Histogram("http_request_sql_queries", "SQL statements executed per request.", ROUTE_LABELS,
+                        buckets=QUERY_COUNT_BUCKETS)
+
+REGISTRY = (requests_total, request_duration, sql_duration, serialization_duration, sql_queries)
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    stats = cache.stats()
+    lines += [
+        "# HELP cache_hits_total Cache lookups that found an entry.", "# TYPE cache_hits_total counter",
+        f"cache_hits_total {stats['hits']}",
+        "# HELP cache_misses_total Cache lookups that found nothing.", "# TYPE cache_misses_total counter",
+        f"cache_misses_total {stats['misses']}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+# -----------------------------
+# Per-request state
+# -----------------------------
+
+class RequestMetrics:
+    __slots__ = ("started", "queries", "sql_seconds", "serialize_seconds", "statements")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.statements = []
+
+
+@contextmanager
+def timed_serialization():
+    """Add the enclosed block to the current request's serialization time."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        state = g.get("request_metrics")
+        if state is not None:
+            state.serialize_seconds += time.perf_counter() - started
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    state = g.get("request_metrics") if has_app_context() else None
+    if state is None:
+        return
+    state.queries += 1
+    state.sql_seconds += elapsed
+    if len(state.statements) < MAX_LOGGED_STATEMENTS:
+        state.statements.append((elapsed, statement))
+
+
+def _start_request():
+    g.request_metrics = RequestMetrics()
+
+
+def _finish_request(response):
+    state = g.get("request_metrics")
+    if state is None:
+        return response
+    labels = (request.method, request.url_rule.rule if request.url_rule else "<unmatched>")
+    status = response.status_code
+    slow_ms = current_app.config.get("SLOW_REQUEST_MS", DEFAULT_SLOW_REQUEST_MS)
+    request_path = request.full_path.rstrip("?")
+
+    def server_timing(total):
+        return (f'db;dur={state.sql_seconds * 1000:.2f};desc="{state.queries} queries", '
+                f'serialize;dur={state.serialize_seconds * 1000:.2f}, '
+                f'total;dur={total * 1000:.2f}')
+
+    def record():
+        # Runs once the body has been sent, so streamed responses are timed in full
+        total = time.perf_counter() - state.started
+        requests_total.inc(*labels, status)
+        request_duration.observe(total, *labels)
+        sql_duration.observe(state.sql_seconds, *labels)
+        serialization_duration.observe(state.serialize_seconds, *labels)
+        sql_queries.observe(state.queries, *labels)
+        # Event streams stay open by design
+        if total * 1000 >= slow_ms and response.mimetype != "text/event-stream":
+            logger.warning(
+                "Slow request %s %s -> %s in %.1f ms (%s)\n%s",
+                labels[0], request_path, status, total * 1000,
+                server_timing(total),
+                "\n".join(f"  {elapsed * 1000:8.2f} ms  {statement}" for elapsed, statement in state.statements),
+            )
+
+    response.headers["Server-Timing"] = server_timing(time.perf_counter() - state.started)
+    response.call_on_close(record)
+    return response
+
+
+def metrics_endpoint():
+    return Response(render(), mimetype="text/plain; version=0.0.4")
+
+
+def init_app(app):
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.add_url_rule("/metrics", "metrics", metrics_endpoint)
@@ -0,0 +1,107 @@
+"""appointment start_at and indexes
+
+Revision ID: 9d41e7a3c2b8
+Revises: 6b2f0c9d1a4e
+Create Date: 2025-10-21 14:03:27.551920
+
+Every ``date`` must be ``YYYY-MM-DD`` (a malformed ``time`` falls back to
+midnight). The rows are checked before any DDL runs, and the upgrade stops
+with the ids of unparseable appointments so they can be fixed first.
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d41e7a3c2b8'
+down_revision = '6b2f0c9d1a4e'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+appointments = sa.table(
+    'appointments',
+    sa.column('id', sa.Integer),
+    sa.column('date', sa.String),
+    sa.column('time', sa.String),
+    sa.column('start_at', sa.DateTime),
+)
+
+
+def _parse(date, time):
+    """``start_at`` for a legacy row, or ``None`` if its date is not ``YYYY-MM-DD``."""
+    try:
+        return datetime.fromisoformat(f"{date.strip()}T{(time or '').strip()}")
+    except ValueError:
+        pass
+    try:
+        # Keep the day if only the time is malformed
+        return datetime.fromisoformat(date.strip())
+    except (AttributeError, ValueError):
+        return None
+
+
+def _batches(bind):
+    # The legacy string columns in id-ordered batches
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(appointments.c.id, appointments.c.date, appointments.c.time)
+            .where(appointments.c.id > last_id)
+            .order_by(appointments.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def _check_dates(bind):
+    # SQLite DDL is not transactional here: fail before the schema changes
+    bad = [row.id for rows in _batches(bind) for row in rows if _parse(row.date, row.time) is None]
+    if bad:
+        shown = ', '.join(map(str, bad[:50])) + (f' and {len(bad) - 50} more' if len(bad) > 50 else '')
+        raise RuntimeError(
+            f"{len(bad)} appointments have a date that is not YYYY-MM-DD (ids: {shown}). "
+            "Fix their date column and run the upgrade again."
+        )
+
+
+def upgrade():
+    bind = op.get_bind()
+    _check_dates(bind)
+
+    with op.batch_alter_table('appointments') as batch_op:
+        batch_op.add_column(sa.Column('start_at', sa.DateTime(), nullable=True))
+
+    for rows in _batches(bind):
+        bind.execute(
+            appointments.update()
+            .where(appointments.c.id == sa.bindparam('_id'))
+            .values(start_at=sa.bindparam('_start_at')),
+            [{'_id': row.id, '_start_at': _parse(row.date, row.time)} for row in rows],
+        )
+
+    with op.batch_alter_table('appointments') as batch_op:
+        batch_op.alter_column('start_at', existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_index('ix_appointments_doctor_id_start_at', ['doctor_id', 'start_at'], unique=False)
+        batch_op.create_index('ix_appointments_patient_id_start_at', ['patient_id', 'start_at'], unique=False)
+        batch_op.create_index('ix_appointments_status_start_at', ['status', 'start_at'], unique=False)
+
+    with op.batch_alter_table('doctors') as batch_op:
+        batch_op.create_index(batch_op.f('ix_doctors_name'), ['name'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('doctors') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_doctors_name'))
+
+    with op.batch_alter_table('appointments') as batch_op:
+        batch_op.drop_index('ix_appointments_status_start_at')
+        batch_op.drop_index('ix_appointments_patient_id_start_at')
+        batch_op.drop_index('ix_appointments_doctor_id_start_at')
+        batch_op.drop_column('start_at')
@@ -0,0 +1,79 @@
+"""appointment foreign keys cascade on delete
+
+Revision ID: a5d3f9b2e8c1
+Revises: f2a6c8e4b1d3
+Create Date: 2025-10-31 11:05:52.870244
+
+Deleting a patient or doctor now removes its appointments in the database.
+SQLite only enforces foreign keys since this release (``PRAGMA foreign_keys``
+in database.py). Any appointments whose patient or doctor was already gone
+are removed first, and the daily counts are recomputed, because the new
+constraints would reject them.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5d3f9b2e8c1'
+down_revision = 'f2a6c8e4b1d3'
+branch_labels = None
+depends_on = None
+
+# Gives SQLite's unnamed constraints a name batch mode can drop
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+FOREIGN_KEYS = (('patient_id', 'patients'), ('doctor_id', 'doctors'))
+
+appointments = sa.table(
+    'appointments',
+    sa.column('doctor_id', sa.Integer),
+    sa.column('patient_id', sa.Integer),
+    sa.column('start_at', sa.DateTime),
+    sa.column('status', sa.String),
+)
+counts = sa.table(
+    'appointment_daily_counts',
+    sa.column('doctor_id', sa.Integer),
+    sa.column('day', sa.Date),
+    sa.column('status', sa.String),
+    sa.column('count', sa.Integer),
+)
+
+
+def _remove_orphans(bind):
+    orphaned = sa.or_(*(
+        appointments.c[column].not_in(sa.select(sa.table(referred, sa.column('id')).c.id))
+        for column, referred in FOREIGN_KEYS
+    ))
+    if not bind.execute(appointments.delete().where(orphaned)).rowcount:
+        return
+    if bind.dialect.name == 'sqlite':
+        day = sa.func.date(appointments.c.start_at)
+    else:
+        day = sa.cast(appointments.c.start_at, sa.Date)
+    status = sa.func.coalesce(appointments.c.status, 'pending')
+    op.execute(counts.delete())
+    op.execute(counts.insert().from_select(
+        ['doctor_id', 'day', 'status', 'count'],
+        sa.select(appointments.c.doctor_id, day, status, sa.func.count())
+        .group_by(appointments.c.doctor_id, day, status),
+    ))
+
+
+def _replace_foreign_keys(ondelete):
+    existing = {fk['constrained_columns'][0]: fk['name']
+                for fk in sa.inspect(op.get_bind()).get_foreign_keys('appointments')}
+    with op.batch_alter_table('appointments', naming_convention=NAMING_CONVENTION) as batch_op:
+        for column, referred in FOREIGN_KEYS:
+            name = f'fk_appointments_{column}_{referred}'
+            batch_op.drop_constraint(existing.get(column) or name, type_='foreignkey')
+            batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    _remove_orphans(op.get_bind())
+    _replace_foreign_keys('CASCADE')
+
+
+def downgrade():
+    _replace_foreign_keys(None)
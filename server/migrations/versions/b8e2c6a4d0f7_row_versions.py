@@ -0,0 +1,31 @@
+"""row version columns
+
+Revision ID: b8e2c6a4d0f7
+Revises: a5d3f9b2e8c1
+Create Date: 2025-11-03 15:48:10.392657
+
+Plain ADD COLUMN rather than batch mode: recreating patients or doctors on
+SQLite would drop the search index triggers.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e2c6a4d0f7'
+down_revision = 'a5d3f9b2e8c1'
+branch_labels = None
+depends_on = None
+
+TABLES = ('patients', 'doctors', 'appointments')
+
+
+def upgrade():
+    for table in TABLES:
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    # SQLite 3.35+ drops columns in place, so the triggers survive here too
+    for table in TABLES:
+        op.drop_column(table, 'version')
@@ -0,0 +1,53 @@
+"""appointment daily counts
+
+Revision ID: c3e8a5f1b7d2
+Revises: 9d41e7a3c2b8
+Create Date: 2025-10-24 10:12:41.208315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e8a5f1b7d2'
+down_revision = '9d41e7a3c2b8'
+branch_labels = None
+depends_on = None
+
+appointments = sa.table(
+    'appointments',
+    sa.column('doctor_id', sa.Integer),
+    sa.column('start_at', sa.DateTime),
+    sa.column('status', sa.String),
+)
+
+
+def upgrade():
+    counts = op.create_table(
+        'appointment_daily_counts',
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('doctor_id', 'day', 'status'),
+    )
+    op.create_index('ix_appointment_daily_counts_day', 'appointment_daily_counts', ['day'], unique=False)
+
+    # Backfill with a single grouped INSERT ... SELECT
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        day = sa.func.date(appointments.c.start_at)
+    else:
+        day = sa.cast(appointments.c.start_at, sa.Date)
+    status = sa.func.coalesce(appointments.c.status, 'pending')
+    op.execute(counts.insert().from_select(
+        ['doctor_id', 'day', 'status', 'count'],
+        sa.select(appointments.c.doctor_id, day, status, sa.func.count())
+        .group_by(appointments.c.doctor_id, day, status),
+    ))
+
+
+def downgrade():
+    op.drop_index('ix_appointment_daily_counts_day', table_name='appointment_daily_counts')
+    op.drop_table('appointment_daily_counts')
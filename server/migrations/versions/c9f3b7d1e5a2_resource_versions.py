@@ -0,0 +1,39 @@
+"""resource versions
+
+Revision ID: c9f3b7d1e5a2
+Revises: d4f1a7c3e9b5
+Create Date: 2025-11-12 15:04:21.730946
+
+Moves the conditional-GET version counters out of the worker processes
+into ``resource_versions``, one row per resource, so every worker sees
+every write.
+"""
+import time
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9f3b7d1e5a2'
+down_revision = 'd4f1a7c3e9b5'
+branch_labels = None
+depends_on = None
+
+RESOURCES = ('patients', 'doctors', 'appointments')
+
+
+def upgrade():
+    table = op.create_table(
+        'resource_versions',
+        sa.Column('resource', sa.String(length=20), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('resource'),
+    )
+    now = time.time()
+    op.bulk_insert(table, [{'resource': resource, 'version': 0, 'updated_at': now} for resource in RESOURCES])
+
+
+def downgrade():
+    op.drop_table('resource_versions')
@@ -0,0 +1,63 @@
+"""appointments archive
+
+Revision ID: d4f1a7c3e9b5
+Revises: b8e2c6a4d0f7
+Create Date: 2025-11-05 10:12:44.218305
+
+Adds ``appointments_archive`` for ``flask archive run``. On SQLite the
+appointments table is rebuilt with AUTOINCREMENT first: without it SQLite
+reuses the highest id after a delete, which could hand out the id of an
+archived appointment again. Downgrading moves archived rows back.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4f1a7c3e9b5'
+down_revision = 'b8e2c6a4d0f7'
+branch_labels = None
+depends_on = None
+
+COLUMNS = ('id', 'date', 'time', 'start_at', 'status', 'reason', 'version', 'patient_id', 'doctor_id')
+
+
+def _set_autoincrement(enabled):
+    if op.get_bind().dialect.name != 'sqlite':
+        return  # Sequences on other databases never reuse ids
+    with op.batch_alter_table('appointments', recreate='always',
+                              table_kwargs={'sqlite_autoincrement': enabled}):
+        pass
+
+
+def upgrade():
+    _set_autoincrement(True)
+    op.create_table(
+        'appointments_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('date', sa.String(length=50), nullable=False),
+        sa.Column('time', sa.String(length=50), nullable=False),
+        sa.Column('start_at', sa.DateTime(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('reason', sa.Text(), nullable=True),
+        sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.ForeignKeyConstraint(['doctor_id'], ['doctors.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_appointments_archive_doctor_id_start_at', 'appointments_archive', ['doctor_id', 'start_at'], unique=False)
+    op.create_index('ix_appointments_archive_patient_id_start_at', 'appointments_archive', ['patient_id', 'start_at'], unique=False)
+    op.create_index('ix_appointments_archive_start_at', 'appointments_archive', ['start_at'], unique=False)
+
+
+def downgrade():
+    columns = ', '.join(COLUMNS)
+    op.execute(f'INSERT INTO appointments ({columns}) SELECT {columns} FROM appointments_archive')
+    op.drop_index('ix_appointments_archive_start_at', table_name='appointments_archive')
+    op.drop_index('ix_appointments_archive_patient_id_start_at', table_name='appointments_archive')
+    op.drop_index('ix_appointments_archive_doctor_id_start_at', table_name='appointments_archive')
+    op.drop_table('appointments_archive')
+    _set_autoincrement(False)
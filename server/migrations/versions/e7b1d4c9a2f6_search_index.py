@@ -0,0 +1,70 @@
+"""full-text search index
+
+Revision ID: e7b1d4c9a2f6
+Revises: c3e8a5f1b7d2
+Create Date: 2025-10-27 16:40:05.113902
+
+SQLite only: FTS5 tables over the patient and doctor search columns, kept
+in sync by triggers. Other databases use the LIKE fallback in search.py.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b1d4c9a2f6'
+down_revision = 'c3e8a5f1b7d2'
+branch_labels = None
+depends_on = None
+
+# Table -> indexed columns
+SEARCH_TABLES = {
+    'patients': ('name', 'contact'),
+    'doctors': ('name', 'specialization'),
+}
+
+
+def _fts5_available(bind):
+    return bind.dialect.name == 'sqlite' and bind.execute(
+        sa.text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+    ).scalar()
+
+
+def upgrade():
+    if not _fts5_available(op.get_bind()):
+        return
+    for table, columns in SEARCH_TABLES.items():
+        fts = f'{table}_fts'
+        cols = ', '.join(columns)
+        new = ', '.join(f'new.{c}' for c in columns)
+        old = ', '.join(f'old.{c}' for c in columns)
+        # Prefix indexes up to 8 characters keep typeahead queries such as
+        # "patie" from merging the doclists of every matching term
+        op.execute(
+            f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{table}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='1 2 3 4 5 6 7 8')"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END"
+        )
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table in SEARCH_TABLES:
+        fts = f'{table}_fts'
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {fts}_{suffix}')
+        op.execute(f'DROP TABLE IF EXISTS {fts}')
@@ -0,0 +1,41 @@
+"""change log
+
+Revision ID: f2a6c8e4b1d3
+Revises: e7b1d4c9a2f6
+Create Date: 2025-10-29 09:21:37.540118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a6c8e4b1d3'
+down_revision = 'e7b1d4c9a2f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # AUTOINCREMENT so sequence numbers are never reused after pruning
+    op.create_table(
+        'change_log',
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('resource', sa.String(length=20), nullable=False),
+        sa.Column('record_id', sa.Integer(), nullable=False),
+        sa.Column('action', sa.String(length=10), nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=True),
+        sa.Column('patient_id', sa.Integer(), nullable=True),
+        sa.Column('data', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.PrimaryKeyConstraint('seq'),
+        sqlite_autoincrement=True,
+    )
+    op.create_index('ix_change_log_doctor_id_seq', 'change_log', ['doctor_id', 'seq'], unique=False)
+    op.create_index('ix_change_log_patient_id_seq', 'change_log', ['patient_id', 'seq'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_change_log_patient_id_seq', table_name='change_log')
+    op.drop_index('ix_change_log_doctor_id_seq', table_name='change_log')
+    op.drop_table('change_log')
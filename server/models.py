@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from extensions import db, ma
 
 # -----------------------------
@@ -11,36 +13,148 @@ class Patient(db.Model):
     name = db.Column(db.String(100), nullable=False)
     age = db.Column(db.Integer, nullable=False)
     contact = db.Column(db.String(100), nullable=True)  # Added for rubric requirement
+    # Row version for optimistic concurrency (If-Match on PATCH); bumped by every update
+    version = db.Column(db.Integer, nullable=False, server_default="1")
 
-    appointments = db.relationship("Appointment", back_populates="patient", cascade="all, delete-orphan")
+    # passive_deletes: the database's ON DELETE CASCADE removes unloaded appointments (see cascades.py)
+    appointments = db.relationship("Appointment", back_populates="patient", cascade="all, delete-orphan",
+                                   passive_deletes=True)
 
 
 class Doctor(db.Model):
     __tablename__ = "doctors"
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)  # doctor_login looks up by name
     specialization = db.Column(db.String(100), nullable=False)
+    version = db.Column(db.Integer, nullable=False, server_default="1")
 
-    appointments = db.relationship("Appointment", back_populates="doctor", cascade="all, delete-orphan")
+    appointments = db.relationship("Appointment", back_populates="doctor", cascade="all, delete-orphan",
+                                   passive_deletes=True)
 
 
 class Appointment(db.Model):
     __tablename__ = "appointments"
+    __table_args__ = (
+        db.Index("ix_appointments_doctor_id_start_at", "doctor_id", "start_at"),
+        db.Index("ix_appointments_patient_id_start_at", "patient_id", "start_at"),
+        db.Index("ix_appointments_status_start_at", "status", "start_at"),
+        # AUTOINCREMENT: ids of archived appointments are never handed out again
+        {"sqlite_autoincrement": True},
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.String(50), nullable=False)
     time = db.Column(db.String(50), nullable=False)
-    status = db.Column(db.String(20), default="pending")  # Added status field for rubric
+    # Typed copy of date + time, kept in sync on flush; used for range queries
+    # active_history: old values are needed to keep the daily counts in sync
+    start_at = db.column_property(db.Column(db.DateTime, nullable=False), active_history=True)
+    status = db.column_property(db.Column(db.String(20), default="pending"), active_history=True)  # Added status field for rubric
     reason = db.Column(db.Text, nullable=True)  # Added for patient submittable attribute
+    version = db.Column(db.Integer, nullable=False, server_default="1")
 
-    patient_id = db.Column(db.Integer, db.ForeignKey("patients.id"), nullable=False)
-    doctor_id = db.Column(db.Integer, db.ForeignKey("doctors.id"), nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey("patients.id", ondelete="CASCADE"), nullable=False)
+    doctor_id = db.column_property(
+        db.Column(db.Integer, db.ForeignKey("doctors.id", ondelete="CASCADE"), nullable=False), active_history=True)
 
     patient = db.relationship("Patient", back_populates="appointments")
     doctor = db.relationship("Doctor", back_populates="appointments")
 
 
+class ArchivedAppointment(db.Model):
+    """A past appointment moved out of ``appointments`` by ``archive.py``; read-only.
+
+    Keeps the live row's id and columns, so list reads can merge both tables.
+    """
+    __tablename__ = "appointments_archive"
+    __table_args__ = (
+        db.Index("ix_appointments_archive_doctor_id_start_at", "doctor_id", "start_at"),
+        db.Index("ix_appointments_archive_patient_id_start_at", "patient_id", "start_at"),
+        db.Index("ix_appointments_archive_start_at", "start_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    date = db.Column(db.String(50), nullable=False)
+    time = db.Column(db.String(50), nullable=False)
+    start_at = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(20), nullable=True)
+    reason = db.Column(db.Text, nullable=True)
+    version = db.Column(db.Integer, nullable=False, server_default="1")
+    patient_id = db.Column(db.Integer, db.ForeignKey("patients.id", ondelete="CASCADE"), nullable=False)
+    doctor_id = db.Column(db.Integer, db.ForeignKey("doctors.id", ondelete="CASCADE"), nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False, server_default=db.func.current_timestamp())
+
+    patient = db.relationship("Patient", viewonly=True)
+    doctor = db.relationship("Doctor", viewonly=True)
+
+
+class AppointmentDailyCount(db.Model):
+    """Appointments per doctor, day and status; maintained by ``aggregates.py``."""
+    __tablename__ = "appointment_daily_counts"
+    __table_args__ = (
+        db.Index("ix_appointment_daily_counts_day", "day"),
+    )
+
+    # No foreign key: rows of a deleted doctor drop to zero and are removed
+    doctor_id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ChangeLogEntry(db.Model):
+    """One write to a patient, doctor or appointment; read by the change feed (``changes.py``)."""
+    __tablename__ = "change_log"
+    __table_args__ = (
+        db.Index("ix_change_log_doctor_id_seq", "doctor_id", "seq"),
+        db.Index("ix_change_log_patient_id_seq", "patient_id", "seq"),
+        # AUTOINCREMENT: sequence numbers are never reused, even after deletes
+        {"sqlite_autoincrement": True},
+    )
+
+    seq = db.Column(db.Integer, primary_key=True)
+    resource = db.Column(db.String(20), nullable=False)  # patients, doctors or appointments
+    record_id = db.Column(db.Integer, nullable=False)
+    action = db.Column(db.String(10), nullable=False)  # created, updated or deleted
+    doctor_id = db.Column(db.Integer, nullable=True)
+    patient_id = db.Column(db.Integer, nullable=True)
+    data = db.Column(db.Text, nullable=True)  # JSON: the new row, the changed fields, or null
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.current_timestamp())
+
+
+class ResourceVersion(db.Model):
+    """Write counter of a resource, behind the conditional-GET ETags (``versions.py``)."""
+    __tablename__ = "resource_versions"
+
+    resource = db.Column(db.String(20), primary_key=True)  # patients, doctors or appointments
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.Float, nullable=False)  # Unix time of the last write
+
+
+def parse_start_at(date, time):
+    """Combine the API's ``YYYY-MM-DD`` date and ``HH:MM`` time strings.
+
+    Raises ``ValueError`` if either part is malformed.
+    """
+    return datetime.fromisoformat(f"{date.strip()}T{time.strip()}")
+
+
+@db.event.listens_for(Appointment, "before_insert")
+@db.event.listens_for(Appointment, "before_update")
+def _sync_start_at(mapper, connection, appointment):
+    appointment.start_at = parse_start_at(appointment.date, appointment.time)
+
+
+@db.event.listens_for(Patient, "before_update")
+@db.event.listens_for(Doctor, "before_update")
+@db.event.listens_for(Appointment, "before_update")
+def _bump_version(mapper, connection, target):
+    # Incremented in SQL so concurrent writers never hand out the same version;
+    # only PATCH with If-Match checks it, other writes stay last-write-wins
+    if db.inspect(target).session.is_modified(target, include_collections=False):
+        target.version = mapper.class_.version + 1
+
+
 # -----------------------------
 # Schemas
 # -----------------------------
@@ -51,6 +165,8 @@ class PatientSchema(ma.SQLAlchemyAutoSchema):
         include_relationships = True
         load_instance = True
 
+    version = ma.auto_field(dump_only=True)
+
 
 class DoctorSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
@@ -58,6 +174,8 @@ class DoctorSchema(ma.SQLAlchemyAutoSchema):
         include_relationships = True
         load_instance = True
 
+    version = ma.auto_field(dump_only=True)
+
 
 class AppointmentSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
@@ -65,22 +183,11 @@ class AppointmentSchema(ma.SQLAlchemyAutoSchema):
         include_fk = True
         load_instance = True
 
+    start_at = ma.auto_field(dump_only=True)
+    version = ma.auto_field(dump_only=True)
 
-# -----------------------------
-# Seed Data
-# -----------------------------
-
-def seed_data(db):
-    if not Doctor.query.first():
-        doc1 = Doctor(name="Dr. Smith", specialization="Cardiology")
-        doc2 = Doctor(name="Dr. Lee", specialization="Dermatology")
-        doc3 = Doctor(name="Dr. Johnson", specialization="Neurology")
-
-        pat1 = Patient(name="Alice", age=30, contact="alice@example.com")
-        pat2 = Patient(name="Bob", age=45, contact="bob@example.com")
-
-        appt1 = Appointment(date="2025-10-01", time="10:00", patient=pat1, doctor=doc1, status="pending", reason="Heart checkup")
-        appt2 = Appointment(date="2025-10-02", time="14:00", patient=pat2, doctor=doc2, status="confirmed", reason="Skin consultation")
 
-        db.session.add_all([doc1, doc2, doc3, pat1, pat2, appt1, appt2])
-        db.session.commit()
\ No newline at end of file
+class AppointmentDetailSchema(AppointmentSchema):
+    """Appointment with its patient and doctor embedded (``?expand=``)."""
+    patient = ma.Nested(PatientSchema, exclude=("appointments",))
+    doctor = ma.Nested(DoctorSchema, exclude=("appointments",))
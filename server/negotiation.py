@@ -0,0 +1,112 @@
+"""Response encodings: gzip/deflate compression and optional MessagePack bodies.
+
+``NegotiatingJSONProvider`` replaces Flask's JSON provider, so every
+``jsonify`` (and marshmallow's ``schema.jsonify``) writes compact JSON, or
+MessagePack when the client sends ``Accept: application/msgpack`` and the
+``msgpack`` package is installed.
+
+``compress`` runs after every request and gzip/deflate-encodes text bodies
+of at least ``COMPRESS_MIN_SIZE`` bytes for clients that accept it, at
+``COMPRESS_LEVEL`` (1-9). Streamed responses (exports, the change stream)
+are compressed chunk by chunk; event streams are flushed after every chunk
+so events are not held back in the compressor.
+"""
+import zlib
+
+from flask import current_app, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import msgpack
+except ImportError:  # optional: JSON only
+    msgpack = None
+
+MSGPACK_MIMETYPES = ("application/msgpack", "application/x-msgpack")
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_LEVEL = 6
+COMPRESSIBLE_MIMETYPES = frozenset((
+    "application/json", "application/x-ndjson", "text/csv", "text/plain",
+    "text/html", "text/event-stream", *MSGPACK_MIMETYPES,
+))
+# Streams whose consumers need every chunk as soon as it is written
+FLUSHED_MIMETYPES = frozenset(("text/event-stream",))
+# zlib window bits per Content-Encoding: gzip adds 16 for the gzip header
+ENCODINGS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+
+def response_mimetype():
+    """The body format negotiated for this request: JSON unless MessagePack is preferred."""
+    if msgpack is None or not has_request_context():
+        return "application/json"
+    best = request.accept_mimetypes.best_match(("application/json", *MSGPACK_MIMETYPES))
+    return best if best in MSGPACK_MIMETYPES else "application/json"
+
+
+class NegotiatingJSONProvider(DefaultJSONProvider):
+    """Compact JSON responses, or MessagePack for clients that ask for it."""
+
+    compact = True
+
+    def response(self, *args, **kwargs):
+        mimetype = response_mimetype()
+        if mimetype == "application/json":
+            return super().response(*args, **kwargs)
+        body = msgpack.packb(self._prepare_response_obj(args, kwargs), default=self.default)
+        return self._app.response_class(body, mimetype=mimetype)
+
+
+def _compressor(encoding):
+    return zlib.compressobj(current_app.config.get("COMPRESS_LEVEL", DEFAULT_LEVEL), zlib.DEFLATED, ENCODINGS[encoding])
+
+
+def _compress_stream(chunks, compressor, flush):
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            data = compressor.compress(chunk)
+            if flush:
+                data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        # Closing the original iterable ends stream_with_context and its session
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+def compress(response):
+    if response.mimetype in ("application/json", *MSGPACK_MIMETYPES) and msgpack is not None:
+        response.vary.add("Accept")
+    if (response.mimetype not in COMPRESSIBLE_MIMETYPES or response.direct_passthrough
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or "Content-Encoding" in response.headers):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(tuple(ENCODINGS))
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, _compressor(encoding),
+                                             response.mimetype in FLUSHED_MIMETYPES)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < current_app.config.get("COMPRESS_MIN_SIZE", DEFAULT_MIN_SIZE):
+            return response
+        compressor = _compressor(encoding)
+        response.set_data(compressor.compress(data) + compressor.flush())
+    response.headers["Content-Encoding"] = encoding
+    # The compressed bytes differ from the identity representation
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app):
+    app.json = NegotiatingJSONProvider(app)
+    app.after_request(compress)
@@ -1,14 +1,26 @@
 from flask import Blueprint, request, jsonify
+from sqlalchemy.orm.exc import StaleDataError
 from extensions import db
 from controllers import (
     get_patients, create_patient, update_patient, delete_patient,
     get_doctors, create_doctor, update_doctor, delete_doctor,
-    get_appointments, create_appointment, update_appointment, delete_appointment
+    get_appointments, create_appointment, update_appointment, delete_appointment,
+    update_appointment_status,
+    get_doctor_availability, get_availability, export_appointments,
+    bulk_create_patients, bulk_create_doctors, bulk_create_appointments,
+    bulk_delete_patients, bulk_delete_doctors, bulk_delete_appointments,
+    bulk_update_appointment_status, get_aggregates, search_records, get_changes, stream_changes, doctor_id_by_name, get_cache_stats
 )
-from models import Doctor, Appointment
 
 api = Blueprint('api', __name__)
 
+
+@api.errorhandler(StaleDataError)
+def stale_data(error):
+    # An ORM flush found the row deleted by another request since it was loaded
+    db.session.rollback()
+    return jsonify({"message": "Record was modified concurrently; reload and retry"}), 409
+
 # -----------------------------
 # AUTHENTICATION ROUTES (SIMPLIFIED)
 # -----------------------------
@@ -22,46 +34,43 @@ def admin_login():
 @api.route('/login/doctor', methods=['POST'])
 def doctor_login():
     data = request.get_json()
-    doctor = Doctor.query.filter_by(name=data.get('username')).first()
-    if doctor and data.get('password') == 'doctor123':
-        return jsonify({"message": "Doctor login successful", "doctor_id": doctor.id}), 200
+    doctor_id = doctor_id_by_name(data.get('username'))
+    if doctor_id and data.get('password') == 'doctor123':
+        return jsonify({"message": "Doctor login successful", "doctor_id": doctor_id}), 200
     return jsonify({"message": "Invalid credentials"}), 401
 
-# -----------------------------
-# APPOINTMENT STATUS UPDATE (DOCTOR) - FIXED
-# -----------------------------
-@api.route('/appointments/<int:appointment_id>/status', methods=['PATCH'])
-def update_appointment_status(appointment_id):
-    user_role = request.headers.get('Role', '')  # Changed to header-based
-    if user_role != 'doctor':
-        return jsonify({"message": "Forbidden"}), 403
-    
-    appointment = Appointment.query.get(appointment_id)
-    if not appointment:
-        return jsonify({"message": "Appointment not found"}), 404
-    
-    data = request.get_json()
-    if 'status' not in data:
-        return jsonify({"message": "Status field required"}), 400
-    
-    appointment.status = data['status']
-    db.session.commit()
-    return jsonify({"message": "Status updated successfully"}), 200
-
 # -----------------------------
 # EXISTING ROUTES
 # -----------------------------
 api.route('/patients', methods=['GET'])(get_patients)
 api.route('/patients', methods=['POST'])(create_patient)
+api.route('/patients/bulk', methods=['POST'])(bulk_create_patients)
+api.route('/patients/bulk', methods=['DELETE'])(bulk_delete_patients)
 api.route('/patients/<int:patient_id>', methods=['PATCH'])(update_patient)
 api.route('/patients/<int:patient_id>', methods=['DELETE'])(delete_patient)
 
 api.route('/doctors', methods=['GET'])(get_doctors)
 api.route('/doctors', methods=['POST'])(create_doctor)
+api.route('/doctors/bulk', methods=['POST'])(bulk_create_doctors)
+api.route('/doctors/bulk', methods=['DELETE'])(bulk_delete_doctors)
 api.route('/doctors/<int:doctor_id>', methods=['PATCH'])(update_doctor)
 api.route('/doctors/<int:doctor_id>', methods=['DELETE'])(delete_doctor)
+api.route('/doctors/<int:doctor_id>/availability', methods=['GET'])(get_doctor_availability)
+api.route('/availability', methods=['GET'])(get_availability)
 
 api.route('/appointments', methods=['GET'])(get_appointments)
 api.route('/appointments', methods=['POST'])(create_appointment)
+api.route('/appointments/export', methods=['GET'])(export_appointments)
+api.route('/appointments/bulk', methods=['POST'])(bulk_create_appointments)
+api.route('/appointments/bulk', methods=['DELETE'])(bulk_delete_appointments)
+api.route('/appointments/status', methods=['PATCH'])(bulk_update_appointment_status)
+api.route('/appointments/<int:appointment_id>/status', methods=['PATCH'])(update_appointment_status)
 api.route('/appointments/<int:appointment_id>', methods=['PATCH'])(update_appointment)
-api.route('/appointments/<int:appointment_id>', methods=['DELETE'])(delete_appointment)
\ No newline at end of file
+api.route('/appointments/<int:appointment_id>', methods=['DELETE'])(delete_appointment)
+
+api.route('/search', methods=['GET'])(search_records)
+api.route('/aggregates', methods=['GET'])(get_aggregates)
+api.route('/changes', methods=['GET'])(get_changes)
+api.route('/changes/stream', methods=['GET'])(stream_changes)
+
+api.route('/cache/stats', methods=['GET'])(get_cache_stats)
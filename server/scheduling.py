@@ -0,0 +1,186 @@
+from bisect import bisect_left, insort
+from datetime import datetime, time, timedelta
+
+from flask import current_app
+from sqlalchemy.orm import aliased
+
+from extensions import db
+from models import Appointment, Doctor
+
+# -----------------------------
+# Defaults (override in app.config)
+# -----------------------------
+DEFAULT_SLOT_MINUTES = 30
+DEFAULT_CLINIC_OPENS = "09:00"
+DEFAULT_CLINIC_CLOSES = "17:00"
+MAX_AVAILABILITY_DAYS = 31
+
+# Statuses that free up the slot again
+NON_BLOCKING_STATUSES = ("cancelled",)
+
+# Status -> statuses it may move to; completed and cancelled are final
+STATUS_TRANSITIONS = {
+    "pending": ("confirmed", "cancelled"),
+    "confirmed": ("completed", "cancelled"),
+    "completed": (),
+    "cancelled": (),
+}
+
+
+def previous_statuses(status):
+    """Statuses an appointment may be in to move to ``status``."""
+    return tuple(current for current, targets in STATUS_TRANSITIONS.items() if status in targets)
+
+
+def slot_length():
+    return timedelta(minutes=current_app.config.get("APPOINTMENT_SLOT_MINUTES", DEFAULT_SLOT_MINUTES))
+
+
+def clinic_hours():
+    opens = current_app.config.get("CLINIC_OPENS", DEFAULT_CLINIC_OPENS)
+    closes = current_app.config.get("CLINIC_CLOSES", DEFAULT_CLINIC_CLOSES)
+    return time.fromisoformat(opens), time.fromisoformat(closes)
+
+
+# -----------------------------
+# Interval index
+# -----------------------------
+
+class IntervalIndex:
+    """Busy intervals of one doctor, sorted by start.
+
+    Because no interval is longer than ``max_length``, only the entries whose
+    start lies in ``[start - max_length, end)`` can overlap a query, so both
+    overlap checks and slot scans bisect instead of walking the whole list.
+    """
+
+    def __init__(self, intervals=(), max_length=timedelta(0)):
+        self._intervals = sorted(intervals)
+        self._starts = [start for start, _ in self._intervals]
+        self.max_length = max_length
+        for start, end in self._intervals:
+            self.max_length = max(self.max_length, end - start)
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def add(self, start, end):
+        insort(self._intervals, (start, end))
+        self._starts.insert(bisect_left(self._starts, start), start)
+        self.max_length = max(self.max_length, end - start)
+
+    def overlapping(self, start, end):
+        """Return the intervals that intersect ``[start, end)``."""
+        lo = bisect_left(self._starts, start - self.max_length)
+        hi = bisect_left(self._starts, end)
+        return [iv for iv in self._intervals[lo:hi] if iv[1] > start]
+
+    def is_free(self, start, end):
+        return not self.overlapping(start, end)
+
+    def free_slots(self, window_start, window_end, length, opens, closes):
+        """Yield slot start times within clinic hours that are not booked."""
+        day = window_start.date()
+        while day <= window_end.date():
+            slot = max(datetime.combine(day, opens), window_start)
+            day_end = min(datetime.combine(day, closes), window_end)
+            while slot + length <= day_end:
+                if self.is_free(slot, slot + length):
+                    yield slot
+                slot += length
+            day += timedelta(days=1)
+
+
+# -----------------------------
+# Queries
+# -----------------------------
+
+def _busy_query(length, window_start, window_end):
+    # Range predicate on (doctor_id, start_at) is an index range scan
+    return (
+        Appointment.query
+        .with_entities(Appointment.id, Appointment.doctor_id, Appointment.start_at)
+        .filter(Appointment.start_at > window_start - length)
+        .filter(Appointment.start_at < window_end)
+        .filter(Appointment.status.notin_(NON_BLOCKING_STATUSES))
+    )
+
+
+def find_conflict(doctor_id, start_at, exclude_id=None):
+    """Return the id of a booking that overlaps ``start_at`` for this doctor, if any."""
+    length = slot_length()
+    query = _busy_query(length, start_at, start_at + length).filter(Appointment.doctor_id == doctor_id)
+    if exclude_id is not None:
+        query = query.filter(Appointment.id != exclude_id)
+    row = query.first()
+    return row.id if row else None
+
+
+def conflict_exists(doctor_id, start_at, exclude_id):
+    """``find_conflict`` as an EXISTS clause, to guard an UPDATE of the appointment itself."""
+    length = slot_length()
+    other = aliased(Appointment)
+    return db.exists().where(
+        other.doctor_id == doctor_id,
+        other.start_at > start_at - length,
+        other.start_at < start_at + length,
+        other.status.notin_(NON_BLOCKING_STATUSES),
+        other.id != exclude_id,
+    )
+
+
+def lock_doctors(doctor_ids):
+    """Hold off other bookings of these doctors until the transaction ends.
+
+    Call before checking for conflicts, so two concurrent requests cannot
+    both find the same slot free. Other databases lock the doctor rows;
+    SQLite has a single write lock, taken here with a no-op UPDATE.
+    """
+    doctors = Doctor.__table__
+    selected = doctors.c.id.in_(sorted(doctor_ids))
+    # On the connection, so the session's write tracking does not count it as a change
+    connection = db.session.connection()
+    if connection.dialect.name == "sqlite":
+        connection.execute(doctors.update().where(selected).values(version=doctors.c.version))
+    else:
+        connection.execute(db.select(doctors.c.id).where(selected).order_by(doctors.c.id).with_for_update())
+
+
+def build_indexes(doctor_ids, window_start, window_end):
+    """Load one IntervalIndex per doctor for the bookings that touch the window."""
+    length = slot_length()
+    indexes = {doctor_id: IntervalIndex(max_length=length) for doctor_id in doctor_ids}
+    if not indexes:
+        return indexes
+    rows = (
+        _busy_query(length, window_start, window_end)
+        .filter(Appointment.doctor_id.in_(indexes))
+        .order_by(Appointment.doctor_id, Appointment.start_at)
+    )
+    for _, doctor_id, start_at in rows:
+        indexes[doctor_id].add(start_at, start_at + length)
+    return indexes
+
+
+def availability(doctor_ids, date_from, date_to):
+    """Map each doctor id to its free slot start times between two dates (inclusive)."""
+    if date_to < date_from:
+        raise ValueError("'date_to' must not be before 'date_from'")
+    if (date_to - date_from).days >= MAX_AVAILABILITY_DAYS:
+        raise ValueError(f"Date range cannot exceed {MAX_AVAILABILITY_DAYS} days")
+
+    window_start = datetime.combine(date_from, time.min)
+    window_end = datetime.combine(date_to + timedelta(days=1), time.min)
+    length = slot_length()
+    opens, closes = clinic_hours()
+
+    indexes = build_indexes(doctor_ids, window_start, window_end)
+    return {
+        doctor_id: list(index.free_slots(window_start, window_end, length, opens, closes))
+        for doctor_id, index in indexes.items()
+    }
+
+
+def doctor_ids_for_specialization(specialization):
+    rows = Doctor.query.with_entities(Doctor.id).filter(Doctor.specialization == specialization)
+    return [doctor_id for doctor_id, in rows]
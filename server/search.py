@@ -0,0 +1,109 @@
+"""Typeahead search over patients and doctors.
+
+On SQLite the FTS5 tables created by the ``e7b1d4c9a2f6`` migration are
+used: every word of the query is matched as a prefix. bm25 needs document
+frequencies over the whole prefix doclist (every patient matches "e" via
+"example.com"), so instead two bounded sets of candidates are ranked here:
+rows matching in the name and rows matching in any column. Name matches
+therefore always reach the ranking, however many rows match only through
+another column. The tables are external-content indexes kept in sync by
+triggers, so ORM writes, bulk imports and cascades all update them. Other
+databases (or SQLite builds without FTS5) fall back to ``ILIKE`` filters.
+"""
+import re
+
+from sqlalchemy import column, inspect, literal_column, table
+
+from extensions import db
+from models import Doctor, Patient
+
+MAX_RESULTS = 50
+MAX_TERMS = 8
+# Rows fetched per match query before ranking
+CANDIDATES = 100
+
+# Resource -> (model, searchable columns); must match the migration
+TARGETS = {
+    "patients": (Patient, ("name", "contact")),
+    "doctors": (Doctor, ("name", "specialization")),
+}
+RESULT_COLUMNS = {
+    "patients": ("id", "name", "contact"),
+    "doctors": ("id", "name", "specialization"),
+}
+
+_WORD = re.compile(r"\w+")
+_fts_tables = {}  # engine URL -> names of the FTS tables present
+
+
+def terms(query):
+    """Lower-cased words of ``query`` (punctuation such as ``@`` separates words)."""
+    return _WORD.findall(query.lower())[:MAX_TERMS]
+
+
+def _has_fts(resource):
+    engine = db.engine
+    if engine.url not in _fts_tables:
+        names = set()
+        if engine.dialect.name == "sqlite":
+            names = {name for name in inspect(engine).get_table_names() if name.endswith("_fts")}
+        _fts_tables[engine.url] = names
+    return f"{resource}_fts" in _fts_tables[engine.url]
+
+
+def _fts_candidates(resource, match):
+    fts = table(f"{resource}_fts", column("rowid"))
+    return (db.select(fts.c.rowid).where(literal_column(fts.name).op("MATCH")(match))
+            .limit(CANDIDATES).scalar_subquery())
+
+
+def _fts_query(resource, words):
+    model, _ = TARGETS[resource]
+    # Quoted so FTS5 operators in user input are plain text; * makes each word a prefix
+    match = " ".join(f'"{word}"*' for word in words)
+    # Each set stops after CANDIDATES rows in rowid order. The name filter
+    # still walks rows matching only in other columns until it has enough
+    # (about 10 ms for a prefix of every contact among 200k patients).
+    in_name = _fts_candidates(resource, f"name : ({match})")
+    anywhere = _fts_candidates(resource, match)
+    return (db.select(*(getattr(model, name) for name in RESULT_COLUMNS[resource]))
+            .where(db.or_(model.id.in_(in_name), model.id.in_(anywhere))))
+
+
+def _like_query(resource, words):
+    model, columns = TARGETS[resource]
+    criteria, in_name = [], []
+    for word in words:
+        pattern = "%" + word.replace("\\", "\\\\").replace("_", "\\_") + "%"
+        criteria.append(db.or_(*(getattr(model, name).ilike(pattern, escape="\\") for name in columns)))
+        in_name.append(model.name.ilike(pattern, escape="\\"))
+    return (
+        db.select(*(getattr(model, name) for name in RESULT_COLUMNS[resource]))
+        .where(*criteria)
+        # Name matches first, so the candidate limit never cuts them off
+        .order_by(db.case((db.and_(*in_name), 0), else_=1), model.name, model.id)
+        .limit(CANDIDATES)
+    )
+
+
+def _rank(words):
+    def key(result):
+        name_words = terms(result["name"])
+        # Name starts with the query, then the query matches somewhere in the name
+        starts = len(name_words) >= len(words) and all(
+            name_word.startswith(word) for name_word, word in zip(name_words, words))
+        in_name = all(any(name_word.startswith(word) for name_word in name_words) for word in words)
+        return not starts, not in_name, len(result["name"]), result["name"].lower(), result["id"]
+    return key
+
+
+def search(resource, query, limit=10):
+    """Best matches for ``query`` as a list of dicts (empty for a blank query)."""
+    words = terms(query)
+    if not words:
+        return []
+    build = _fts_query if _has_fts(resource) else _like_query
+    names = RESULT_COLUMNS[resource]
+    results = [dict(zip(names, row)) for row in db.session.execute(build(resource, words))]
+    results.sort(key=_rank(words))
+    return results[:min(limit, MAX_RESULTS)]
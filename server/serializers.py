@@ -0,0 +1,74 @@
+from datetime import date, datetime, time
+from functools import lru_cache
+
+from sqlalchemy import inspect
+
+from models import Patient, Doctor, Appointment
+
+# Column types whose values need converting to be JSON friendly
+_ISO_TYPES = (datetime, date, time)
+
+
+class RowSerializer:
+    """Dump list rows straight from column tuples.
+
+    Selects only the requested columns (``?fields=``) and zips each result
+    row into a dict, so no ORM instances or marshmallow fields are involved.
+    Output matches the model's ``SQLAlchemyAutoSchema`` for the same columns.
+    """
+
+    def __init__(self, model, exclude=()):
+        self.model = model
+        self.columns = {
+            attr.key: getattr(model, attr.key)
+            for attr in inspect(model).column_attrs
+            if attr.key not in exclude
+        }
+        self._iso = {
+            key for key, column in self.columns.items()
+            if column.type.python_type in _ISO_TYPES
+        }
+        self._plan = lru_cache(maxsize=64)(self._compile)
+
+    def parse_fields(self, value):
+        """Turn ``"id,name"`` into a tuple of known column names (all if empty)."""
+        if not value:
+            return tuple(self.columns)
+        fields = tuple(dict.fromkeys(part.strip() for part in value.split(',') if part.strip()))
+        unknown = [name for name in fields if name not in self.columns]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}; allowed: {', '.join(self.columns)}")
+        return fields
+
+    def _compile(self, fields):
+        # The primary key is always selected first (keyset cursor) and dropped again if not requested
+        selected = ('id', *(name for name in fields if name != 'id'))
+        offset = 0 if 'id' in fields else 1
+        names = selected[offset:]
+        entities = [self.columns[name] for name in selected]
+        iso = [i for i, name in enumerate(selected) if name in self._iso]
+
+        if not iso:
+            def dump(row):
+                return dict(zip(names, row[offset:]))
+        else:
+            def dump(row):
+                values = list(row)
+                for i in iso:
+                    if values[i] is not None:
+                        values[i] = values[i].isoformat()
+                return dict(zip(names, values[offset:]))
+        return entities, dump
+
+    def entities(self, fields):
+        """Column expressions to pass to ``with_entities``; ``row[0]`` is always the id."""
+        return self._plan(fields)[0]
+
+    def dump(self, rows, fields):
+        dump_row = self._plan(fields)[1]
+        return [dump_row(row) for row in rows]
+
+
+patient_serializer = RowSerializer(Patient)
+doctor_serializer = RowSerializer(Doctor)
+appointment_serializer = RowSerializer(Appointment)
@@ -1,52 +1,79 @@
 from flask import Flask
 from flask_cors import CORS
-from flask_migrate import Migrate
 import os
 
-from extensions import db, ma
-from models import seed_data
+from extensions import db, ma, cache, migrate
 from routes import api
+from seed import seed_command
+import aggregates
+import archive
+import changes
+import database
+import metrics
+import negotiation
 
-app = Flask(__name__)
-CORS(app, supports_credentials=True)  # Fixed CORS for sessions
-
-# -----------------------------
-# Config
-# -----------------------------
-# Use DATABASE_URL from environment, fallback to local SQLite
-app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv(
-    "DATABASE_URL", "sqlite:///healthcare.db"
-)
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.config["SECRET_KEY"] = "your-secret-key-here"
-
-# -----------------------------
-# Init extensions
-# -----------------------------
-db.init_app(app)
-ma.init_app(app)
-
-# Setup Flask-Migrate
-migrate = Migrate(app, db)
-
-# -----------------------------
-# Register blueprint
-# -----------------------------
-app.register_blueprint(api, url_prefix="/api")
-
-# -----------------------------
-# Seed data only if needed
-# -----------------------------
-with app.app_context():
-    db.create_all()
-    seed_data(db)
-
-# -----------------------------
-# Test route
-# -----------------------------
-@app.route("/")
-def home():
-    return {"message": "Healthcare API is running!"}, 200
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+
+def create_app(config=None):
+    """Build the Flask app without touching the database.
+
+    The schema is managed with ``flask db upgrade`` and demo data is loaded
+    with ``flask seed``, so creating an app (per gunicorn worker, or once
+    with ``--preload``) opens no connections.
+    """
+    app = Flask(__name__)
+    CORS(
+        app,
+        supports_credentials=True,  # Fixed CORS for sessions
+        expose_headers=["X-Next-Cursor", "Link", "ETag", "Server-Timing"],
+    )
+
+    # -----------------------------
+    # Config
+    # -----------------------------
+    # Use DATABASE_URL from environment, fallback to local SQLite
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv(
+        "DATABASE_URL", "sqlite:///healthcare.db"
+    )
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["SECRET_KEY"] = "your-secret-key-here"
+    if config:
+        app.config.update(config)
+    # Pool sizing, SQLite pragmas and the optional read pool (see database.py)
+    database.configure(app)
+
+    # -----------------------------
+    # Init extensions
+    # -----------------------------
+    db.init_app(app)
+    database.init_app(app, db)
+    ma.init_app(app)
+    cache.init_app(app)
+    metrics.init_app(app)
+    negotiation.init_app(app)
+    changes.init_app(app)
+    migrate.init_app(app, db, directory=MIGRATIONS_DIR)
+
+    # -----------------------------
+    # Register blueprint and CLI commands
+    # -----------------------------
+    app.register_blueprint(api, url_prefix="/api")
+    app.cli.add_command(seed_command)
+    app.cli.add_command(aggregates.cli)
+    app.cli.add_command(archive.cli)
+
+    # -----------------------------
+    # Test route
+    # -----------------------------
+    @app.route("/")
+    def home():
+        return {"message": "Healthcare API is running!"}, 200
+
+    return app
+
+
+app = create_app()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,51 @@
+"""Fixtures: an app on a fresh, fully migrated SQLite file per test.
+
+Run from the ``server`` directory with ``python -m pytest``.
+"""
+from contextlib import contextmanager
+
+import pytest
+from flask_migrate import upgrade
+
+from extensions import db
+from server import create_app
+
+ADMIN = {"Role": "admin"}
+DOCTOR = {"Role": "doctor"}
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}", "TESTING": True})
+    with app.app_context():
+        upgrade()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def data(app):
+    """Synthetic doctors, patients and appointments; returns their ids."""
+    from benchmarks.synthetic import generate
+    return generate(db, doctors=60, patients=60, appointments=600)
+
+
+@contextmanager
+def count_queries():
+    """Count the SQL statements sent to the database inside the block."""
+    counter = {"queries": 0}
+
+    def before_cursor_execute(*args):
+        counter["queries"] += 1
+
+    db.event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        db.event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
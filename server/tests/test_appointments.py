@@ -0,0 +1,62 @@
+"""Booking and status rules of the appointment routes."""
+from concurrent.futures import ThreadPoolExecutor
+
+from conftest import ADMIN, DOCTOR
+from controllers import patient_exists
+from extensions import db
+from models import Appointment
+
+
+def _book(client, patient_id, doctor_id, time="10:00"):
+    return client.post("/api/appointments", json={
+        "date": "2030-01-07", "time": time, "patient_id": patient_id, "doctor_id": doctor_id}, headers=ADMIN)
+
+
+def test_booking_for_patient_deleted_elsewhere(client, data):
+    patient_id, doctor_id = data["patient_ids"][0], data["doctor_ids"][0]
+    assert patient_exists(patient_id)  # cached hit
+    # Deleted behind the cache's back, as another worker or a script would
+    db.session.execute(db.text("DELETE FROM patients WHERE id = :id"), {"id": patient_id})
+    db.session.commit()
+
+    assert _book(client, patient_id, doctor_id).status_code == 404
+    assert _book(client, patient_id, doctor_id, "11:00").status_code == 404
+
+
+def test_status_route_follows_transitions(client, data):
+    appointment_id = _book(client, data["patient_ids"][0], data["doctor_ids"][0]).get_json()["id"]
+    url = f"/api/appointments/{appointment_id}/status"
+
+    assert client.patch(url, json={"status": "bogus"}, headers=DOCTOR).status_code == 400
+    assert client.patch(url, json={"status": "cancelled"}, headers=DOCTOR).status_code == 200
+    assert client.patch(url, json={"status": "cancelled"}, headers=DOCTOR).status_code == 200  # unchanged
+    assert client.patch(url, json={"status": "pending"}, headers=DOCTOR).status_code == 409
+    assert client.patch("/api/appointments/999999/status", json={"status": "confirmed"},
+                        headers=DOCTOR).status_code == 404
+    assert db.session.get(Appointment, appointment_id).status == "cancelled"
+
+
+def test_import_rejects_unknown_status(client, data):
+    records = [{"date": "2030-02-01", "time": "09:00", "status": "bogus",
+                "patient_id": data["patient_ids"][0], "doctor_id": data["doctor_ids"][0]}]
+    response = client.post("/api/appointments/bulk", json=records, headers=ADMIN)
+    result = response.get_json()
+    assert result["inserted"] == 0
+    assert list(result["errors"][0]["errors"]) == ["status"]
+
+
+def test_concurrent_bookings_of_one_slot(app, data):
+    patient_ids, doctor_id = data["patient_ids"], data["doctor_ids"][0]
+
+    def book(patient_id):
+        with app.test_client() as client:
+            return _book(client, patient_id, doctor_id, "16:30").status_code
+
+    with ThreadPoolExecutor(12) as pool:
+        statuses = list(pool.map(book, patient_ids[:12]))
+    assert sorted(statuses) == [201] + [409] * 11
+
+
+def test_status_update_rejects_boolean_ids(client, data):
+    response = client.patch("/api/appointments/status", json=[{"id": True, "status": "cancelled"}], headers=DOCTOR)
+    assert response.status_code == 400
@@ -0,0 +1,51 @@
+"""Conditional GETs see writes made by any worker."""
+from conftest import ADMIN
+from extensions import cache, db
+from models import ResourceVersion
+from server import create_app
+
+
+def _version(resource):
+    return db.session.scalar(db.select(ResourceVersion.version).where(ResourceVersion.resource == resource))
+
+
+def test_write_in_another_worker_invalidates_etag(app, client, data):
+    etag = client.get("/api/doctors").headers["ETag"]
+    patients_etag = client.get("/api/patients").headers["ETag"]
+    version = _version("doctors")
+    assert client.get("/api/doctors", headers={"If-None-Match": etag}).status_code == 304
+
+    # A second app on the same database stands in for another worker process
+    other = create_app({"SQLALCHEMY_DATABASE_URI": app.config["SQLALCHEMY_DATABASE_URI"], "TESTING": True})
+    created = other.test_client().post("/api/doctors", json={"name": "Dr. Other", "specialization": "Cardiology"},
+                                       headers=ADMIN)
+    assert created.status_code == 201
+    db.session.remove()
+    assert _version("doctors") == version + 1
+
+    response = client.get("/api/doctors", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert client.get("/api/patients", headers={"If-None-Match": patients_etag}).status_code == 304
+
+
+def test_rejected_write_keeps_etag(client, data):
+    etag = client.get("/api/patients").headers["ETag"]
+    response = client.patch(f"/api/patients/{data['patient_ids'][0]}", json={"name": "Renamed"},
+                            headers={**ADMIN, "If-Match": '"999"'})
+    assert response.status_code == 412
+    assert client.get("/api/patients", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_doctor_list_cache_follows_other_workers(app, client, data):
+    count = len(client.get("/api/doctors?limit=500").get_json())
+    local = cache.backend
+
+    # The other worker has its own in-process cache, so it cannot invalidate ours
+    other = create_app({"SQLALCHEMY_DATABASE_URI": app.config["SQLALCHEMY_DATABASE_URI"], "TESTING": True})
+    assert other.test_client().post("/api/doctors", json={"name": "Dr. Other", "specialization": "Cardiology"},
+                                    headers=ADMIN).status_code == 201
+    cache.backend = local
+    db.session.remove()
+
+    assert len(client.get("/api/doctors?limit=500").get_json()) == count + 1
@@ -0,0 +1,111 @@
+"""Daily counts and change log entries stay in step with every write path."""
+from datetime import datetime
+
+import pytest
+
+import aggregates
+import archive
+from conftest import ADMIN, DOCTOR
+from extensions import db
+from models import Appointment, ArchivedAppointment, ChangeLogEntry
+
+
+def _logged(action, resource="appointments"):
+    return db.session.scalar(db.select(db.func.count()).select_from(ChangeLogEntry)
+                             .where(ChangeLogEntry.resource == resource, ChangeLogEntry.action == action))
+
+
+def _appointments(model=Appointment, *criteria):
+    return db.session.scalar(db.select(db.func.count()).select_from(model).where(*criteria))
+
+
+def _first(status=None):
+    query = db.select(Appointment).order_by(Appointment.id)
+    if status:
+        query = query.where(Appointment.status == status)
+    return db.session.scalars(query).first()
+
+
+@pytest.fixture(autouse=True)
+def consistent_counts(data):
+    assert aggregates.check() == []
+    yield
+    db.session.remove()
+    assert aggregates.check() == []
+
+
+def test_create_and_move_appointment(client, data):
+    patient_id, doctor_id = data["patient_ids"][0], data["doctor_ids"][0]
+    created = client.post("/api/appointments", json={
+        "date": "2030-01-07", "time": "10:00", "patient_id": patient_id, "doctor_id": doctor_id}, headers=ADMIN)
+    assert created.status_code == 201
+    appointment_id = created.get_json()["id"]
+    moved = client.patch(f"/api/appointments/{appointment_id}", json={
+        "date": "2030-01-08", "time": "11:00", "doctor_id": data["doctor_ids"][1]}, headers=ADMIN)
+    assert moved.status_code == 200
+    assert _logged("created") == 1
+    assert _logged("updated") == 2  # new owner and previous owner
+
+
+def test_status_updates(client, data):
+    pending = _first("pending")
+    assert client.patch(f"/api/appointments/{pending.id}/status", json={"status": "confirmed"},
+                        headers=DOCTOR).status_code == 200
+    others = db.session.scalars(db.select(Appointment.id).where(Appointment.status == "pending").limit(5)).all()
+    response = client.patch("/api/appointments/status", json=[{"id": i, "status": "cancelled"} for i in others],
+                            headers=DOCTOR)
+    assert response.status_code == 200
+    assert sorted(response.get_json()["updated"]) == sorted(others)
+    assert _logged("updated") == 1 + len(others)
+
+
+def test_bulk_import(client, data):
+    records = [{"date": "2030-02-01", "time": f"{9 + i:02d}:00", "patient_id": data["patient_ids"][i],
+                "doctor_id": data["doctor_ids"][0]} for i in range(5)]
+    response = client.post("/api/appointments/bulk", json=records, headers=ADMIN)
+    assert response.status_code == 201, response.get_json()
+    assert _logged("created") == 5
+
+
+def test_delete_appointment(client, data):
+    assert client.delete(f"/api/appointments/{_first().id}", headers=ADMIN).status_code == 204
+    assert _logged("deleted") == 1
+
+
+def test_delete_doctor_cascades(client, data):
+    doctor_id = data["doctor_ids"][0]
+    appointments = _appointments(Appointment, Appointment.doctor_id == doctor_id)
+    assert appointments
+    assert client.delete(f"/api/doctors/{doctor_id}", headers=ADMIN).status_code == 204
+    assert _appointments(Appointment, Appointment.doctor_id == doctor_id) == 0
+    assert _logged("deleted") == appointments
+
+
+def test_bulk_deletes(client, data):
+    patient_ids = data["patient_ids"][:3]
+    cascaded = _appointments(Appointment, Appointment.patient_id.in_(patient_ids))
+    response = client.delete("/api/patients/bulk", json=patient_ids, headers=ADMIN)
+    assert response.status_code == 200
+    assert response.get_json()["appointments_deleted"] == cascaded
+
+    doctor_id = data["doctor_ids"][1]
+    removed = _appointments(Appointment, Appointment.doctor_id == doctor_id)
+    response = client.delete("/api/appointments/bulk", json={"filter": {"doctor_id": doctor_id}}, headers=ADMIN)
+    assert response.status_code == 200
+    assert _logged("deleted") == cascaded + removed
+
+
+def test_archive_then_delete_patient(client, data):
+    before = client.get("/api/appointments?limit=500").get_json()
+    while archive.archive_batch(datetime(2100, 1, 1), batch_size=100):
+        pass
+    assert _appointments(ArchivedAppointment)
+    assert aggregates.check() == []
+    assert client.get("/api/appointments?limit=500").get_json() == before
+
+    patient_id = db.session.scalar(db.select(ArchivedAppointment.patient_id))
+    archived = _appointments(ArchivedAppointment, ArchivedAppointment.patient_id == patient_id)
+    live = _appointments(Appointment, Appointment.patient_id == patient_id)
+    assert client.delete(f"/api/patients/{patient_id}", headers=ADMIN).status_code == 204
+    assert _appointments(ArchivedAppointment, ArchivedAppointment.patient_id == patient_id) == 0
+    assert _logged("deleted") == archived + live
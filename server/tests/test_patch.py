@@ -0,0 +1,15 @@
+"""Optimistic concurrency on PATCH through row versions."""
+from conftest import ADMIN
+
+
+def test_if_match(client, data):
+    url = f"/api/patients/{data['patient_ids'][0]}"
+    current = client.patch(url, json={"age": 41}, headers=ADMIN)
+    version = current.get_json()["version"]
+
+    assert client.patch(url, json={"age": 42}, headers={**ADMIN, "If-Match": f'"{version - 1}"'}).status_code == 412
+    assert client.patch(url, json={"age": 42}, headers={**ADMIN, "If-Match": f'"{version}"'}).status_code == 200
+    assert client.patch(url, json={"age": 43}, headers={**ADMIN, "If-Match": "*"}).status_code == 200
+    assert client.patch(url, json={"age": 44}, headers={**ADMIN, "If-Match": "invalid"}).status_code == 400
+    assert client.patch("/api/patients/999999", json={"age": 44},
+                        headers={**ADMIN, "If-Match": "*"}).status_code == 404
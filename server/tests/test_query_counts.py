@@ -0,0 +1,21 @@
+import pytest
+
+from conftest import count_queries
+
+EXPANDED_LISTS = (
+    "/api/patients?expand=appointments",
+    "/api/doctors?expand=appointments",
+    "/api/appointments?expand=patient,doctor",
+)
+
+
+@pytest.mark.parametrize("url", EXPANDED_LISTS)
+def test_expanded_list_queries_do_not_grow_with_page_size(client, data, url):
+    counts = []
+    for limit in (5, 50):
+        with count_queries() as counter:
+            response = client.get(f"{url}&limit={limit}")
+        assert response.status_code == 200
+        assert len(response.get_json()) == limit
+        counts.append(counter["queries"])
+    assert counts[0] == counts[1]
@@ -0,0 +1,23 @@
+"""Search ranking keeps name matches however many rows match elsewhere."""
+import pytest
+
+import search
+from extensions import db
+from models import Patient
+
+
+@pytest.fixture
+def patients(app):
+    db.session.add_all(Patient(name=f"Patient {i}", age=30, contact=f"alpha{i}@mail.com") for i in range(150))
+    db.session.add(Patient(name="Alpha Beta", age=40, contact="ab@mail.com"))
+    db.session.commit()
+
+
+@pytest.mark.parametrize("fts", [True, False], ids=["fts", "like"])
+def test_name_match_beats_contact_matches(client, patients, monkeypatch, fts):
+    if not fts:
+        monkeypatch.setattr(search, "_has_fts", lambda resource: False)
+    elif not search._has_fts("patients"):
+        pytest.skip("SQLite was built without FTS5")
+    results = client.get("/api/search?q=alpha&type=patients").get_json()["patients"]
+    assert results[0]["name"] == "Alpha Beta"
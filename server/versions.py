@@ -0,0 +1,79 @@
+"""Write counters behind the conditional-GET ETags.
+
+Every transaction that writes to a resource's table bumps that resource's
+row in ``resource_versions`` with one UPDATE just before it commits. The
+bump commits or rolls back with the write itself, so every worker process
+sees the same counters and a cached ETag is invalidated as soon as the
+write commits, whichever worker served it.
+"""
+import time
+
+from extensions import db
+from models import ResourceVersion
+
+# Resources are named after their tables
+RESOURCES = ("patients", "doctors", "appointments")
+
+
+def current(*resources):
+    """Return ``{resource: (version, last_modified_timestamp)}`` in one query."""
+    table = ResourceVersion.__table__
+    rows = db.session.execute(
+        db.select(table.c.resource, table.c.version, table.c.updated_at)
+        .where(table.c.resource.in_(resources))
+    ).all()
+    return {resource: (version, updated_at) for resource, version, updated_at in rows}
+
+
+# -----------------------------
+# Write tracking
+# -----------------------------
+# Every commit that touched a table bumps its resource, whether the write
+# went through the unit of work or a bulk insert/update/delete statement.
+
+def _changed(session):
+    return session.info.setdefault("changed_resources", set())
+
+
+def mark_changed(session, *resources):
+    """Bump ``resources`` when ``session`` commits, for writes no hook can see (database cascades)."""
+    _changed(session).update(resources)
+
+
+@db.event.listens_for(db.session, "before_flush")
+def _track_flush(session, flush_context, instances):
+    changed = _changed(session)
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table in RESOURCES:
+            changed.add(table)
+
+
+@db.event.listens_for(db.session, "do_orm_execute")
+def _track_statement(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.local_table.name in RESOURCES:
+        _changed(orm_execute_state.session).add(mapper.local_table.name)
+
+
+@db.event.listens_for(db.session, "before_commit")
+def _bump_on_commit(session):
+    # The commit's own flush runs after this hook; flush first so its writes are counted
+    session.flush()
+    changed = session.info.pop("changed_resources", None)
+    if not changed:
+        return
+    table = ResourceVersion.__table__
+    # Last statement of the transaction, so the hot rows stay locked only for the commit
+    session.connection().execute(
+        table.update()
+        .where(table.c.resource.in_(sorted(changed)))
+        .values(version=table.c.version + 1, updated_at=time.time())
+    )
+
+
+@db.event.listens_for(db.session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("changed_resources", None)